@@ -3,111 +3,271 @@ EduAvatar LiveKit Agent
 Real-time voice AI pipeline: User Audio -> VAD -> STT -> Pedagogical LLM -> TTS -> Avatar
 """
 
+import asyncio
 import os
 import json
 import logging
-from datetime import datetime
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
 
 from dotenv import load_dotenv
 load_dotenv()
 
 from livekit.agents import (
-    Agent, AgentSession, JobContext, RunContext,
-    function_tool, cli, llm
+    Agent, AgentSession, JobContext, JobExecutorType, JobProcess, RunContext,
+    WorkerOptions, function_tool, cli, llm
 )
-from livekit.plugins import silero, deepgram, cartesia, openai
 
 from pedagogy.engine import PedagogicalEngine
+from pedagogy.learner import LearnerModel, LearnerStore
 from pedagogy.prompts import build_system_prompt
+from pedagogy.question_bank import course_topics
+from rag.context import ContextAssembler
+from rag.prefetch import SpeculativePrefetcher
 from rag.retriever import CurriculumRetriever
 from sentiment.analyzer import SentimentAnalyzer
+from sentiment.prosody import ProsodyExtractor
+from session.capacity import AdmissionController
+from session.context_message import build_context_message
+from session.context_window import ContextWindow
+from session.enrichment import Enricher, TurnPreparer
+from session.history import ROLE_CODES, ConversationHistory
+from session.snapshot import SessionSnapshot, SnapshotStore
+from tools.cache import ToolResultCache
+from tools.progress import ProgressTracker
+from utils.pools import shared_loop
+from utils.tracing import Tracer, traced
 
 logger = logging.getLogger("eduavatar-agent")
 logger.setLevel(logging.INFO)
 
+# Shared by every session in the process; see utils/pools.py for what may be
+# shared and what must stay per session.
 pedagogy_engine = PedagogicalEngine()
 curriculum_retriever = CurriculumRetriever()
 sentiment_analyzer = SentimentAnalyzer()
+context_assembler = ContextAssembler()
+progress_tracker = ProgressTracker()
+learner_store = LearnerStore()
+snapshot_store = SnapshotStore()
+tracer = Tracer()
+tool_cache = ToolResultCache()
+tracer.exporters.append(tool_cache.prometheus_text)
+admission = AdmissionController()
+_vad = None
+_vad_lock = threading.Lock()
 
 
 class EduAvatarAgent(Agent):
     """Educational avatar agent with pedagogical reasoning."""
 
-    def __init__(self, session_config: dict):
+    def __init__(
+        self,
+        session_config: dict,
+        snapshot: Optional[SessionSnapshot] = None,
+        snapshot_key: Optional[str] = None,
+    ):
         self.session_config = session_config
         self.persona = session_config.get("persona", {})
         self.student = session_config.get("student", {})
         self.course = session_config.get("course", {})
-        self.conversation_history: list[dict] = []
+        self.resumed = snapshot is not None
+        if snapshot is not None:
+            self.session_id = snapshot.session_id
+            self.conversation_history = snapshot.history
+        else:
+            self.session_id = session_config.get("sessionId") or str(uuid.uuid4())
+            self.conversation_history = ConversationHistory()
+        if snapshot is not None and snapshot.learner is not None:
+            # Newer than the learner store, which is only written when a session closes.
+            self.learner = snapshot.learner.aligned_to(LearnerModel.from_course(self.course))
+        else:
+            self.learner = learner_store.load(self.student.get("id"), self.course)
+        self.objective_descriptions = {
+            objective["id"]: objective.get("description", objective["id"])
+            for module in self.course.get("modules", [])
+            for objective in module.get("learningObjectives", [])
+            if objective.get("id")
+        }
         self.current_objective = None
-        self.session_start = datetime.utcnow()
-
-        system_prompt = build_system_prompt(
-            persona=self.persona,
-            student=self.student,
-            course=self.course,
-            teaching_style=self.persona.get("teachingStyle", "ADAPTIVE"),
+        self.current_objective_id = None
+        self.target_level = None
+        self._advance_objective()
+        self.session_start = (
+            datetime.utcfromtimestamp(snapshot.session_start) if snapshot is not None else datetime.utcnow()
+        )
+        self.context_tokens_saved = snapshot.context_tokens_saved if snapshot is not None else 0
+        self.context_window = ContextWindow()
+        self.prefetcher = SpeculativePrefetcher(self._search_curriculum)
+        self.prosody = ProsodyExtractor()
+        self.turn_preparer = TurnPreparer([
+            Enricher("sentiment", self._analyze_sentiment, fallback="neutral", reuse_last=True),
+            Enricher("context", self._retrieve_context, fallback=[]),
+        ])
+
+        if snapshot is not None:
+            system_prompt = snapshot.system_prompt
+        else:
+            system_prompt = build_system_prompt(
+                persona=self.persona,
+                student=self.student,
+                course=self.course,
+                teaching_style=self.persona.get("teachingStyle", "ADAPTIVE"),
+            )
+        self.system_prompt = system_prompt
+        self.snapshots = snapshot_store.writer(snapshot_key, self.snapshot)
+        # Set when the student ends the lesson, as opposed to dropping out.
+        self.lesson_ended = False
+        if self.snapshots is not None:
+            # A resumed session starts a fresh file from the state it loaded.
+            self.snapshots.write_base()
+
+        super().__init__(instructions=system_prompt, chat_ctx=self._restored_chat_ctx())
+
+    def snapshot(self) -> SessionSnapshot:
+        return SessionSnapshot(
+            self.session_id,
+            self.system_prompt,
+            self.conversation_history,
+            self.learner,
+            self.session_start.replace(tzinfo=timezone.utc).timestamp(),
+            self.context_tokens_saved,
         )
 
-        super().__init__(instructions=system_prompt)
-
-    async def on_enter(self):
-        """Called when agent enters the session."""
-        greeting = self.persona.get(
+    def _restored_chat_ctx(self) -> Optional[llm.ChatContext]:
+        """The LLM context of a resumed session: summary of older turns, then the retained turns."""
+        if not self.resumed:
+            return None
+        chat_ctx = llm.ChatContext.empty()
+        summary = self.conversation_history.summary()
+        if summary:
+            chat_ctx.add_message(role="system", content=summary)
+        for turn in self.conversation_history:
+            role = "user" if turn.role == ROLE_CODES["student"] else "assistant"
+            chat_ctx.add_message(role=role, content=turn.content)
+        return chat_ctx
+
+    def record_turn(self, role: str, text: str, sentiment: Optional[str] = None):
+        turn = self.conversation_history.append(role, text, sentiment)
+        if self.snapshots is not None:
+            self.snapshots.append_turn(turn)
+
+    def greeting(self) -> str:
+        if self.resumed:
+            return self.persona.get(
+                "resumeGreeting",
+                f"Welcome back, {self.student.get('name', 'there')}! Let's pick up where we left off.",
+            )
+        return self.persona.get(
             "greeting",
             f"Hello {self.student.get('name', 'there')}! "
             f"I'm {self.persona.get('name', 'your tutor')}. "
             f"What would you like to learn about today?"
         )
-        self.session.say(greeting)
+
+    async def on_enter(self):
+        """Called when agent enters the session."""
+        self.session.say(self.greeting())
 
     async def on_user_turn(self, turn):
         """Process each user turn with pedagogical context."""
         user_text = turn.text
 
-        sentiment = await sentiment_analyzer.analyze(user_text)
+        with tracer.span("agent.user_turn", session_id=self.session_id):
+            enriched = await self.turn_preparer.prepare(user_text)
+            sentiment = enriched["sentiment"]
+            context_chunks = enriched["context"]
+            missed = self.turn_preparer.last_missed
+            for name, seconds in self.turn_preparer.last_timings.items():
+                if name != "total":
+                    tracer.record(f"enrich.{name}", seconds * 1000, session_id=self.session_id, missed=name in missed)
+            if missed:
+                logger.warning(
+                    f"Turn enrichers missed deadline or failed: {missed} "
+                    f"timings={self.turn_preparer.last_timings}"
+                )
+
+            self.record_turn("student", user_text, sentiment)
+
+            context_message = self._build_context_message(context_chunks, sentiment)
+        return context_message
+
+    def record_assessment(self, objective_id: Optional[str], score: float):
+        """Update mastery for an objective (score in [0, 1]) and re-plan the next objective."""
+        if objective_id and self.learner.update(objective_id, score):
+            self._advance_objective()
+            if self.snapshots is not None:
+                self.snapshots.append_state(self.context_tokens_saved, self.learner)
+
+    def _advance_objective(self):
+        planned = self.learner.next_objective()
+        if planned is None:
+            self.current_objective = self.current_objective_id = self.target_level = None
+            return
+        self.current_objective_id, self.target_level = planned
+        self.current_objective = (
+            f"{self.objective_descriptions.get(self.current_objective_id, self.current_objective_id)} "
+            f"(target level: {self.target_level.name})"
+        )
 
-        context_chunks = await curriculum_retriever.retrieve(
-            query=user_text,
+    def stt_node(self, audio, model_settings):
+        """Feed the student's audio frames to the prosody extractor on their way to STT."""
+        async def tapped():
+            async for frame in audio:
+                self.prosody.push(frame.data, frame.sample_rate, frame.num_channels)
+                yield frame
+
+        return Agent.default.stt_node(self, tapped(), model_settings)
+
+    async def _analyze_sentiment(self, user_text: str) -> str:
+        """Combine the turn's words with its prosody."""
+        return await sentiment_analyzer.analyze(user_text, prosody=self.prosody.take_turn_features())
+
+    async def _retrieve_context(self, user_text: str) -> list[dict]:
+        """Retrieve curriculum chunks for a user turn, reusing a speculative prefetch if one matches."""
+        prefetched = await self.prefetcher.take(user_text)
+        if prefetched is not None:
+            return prefetched
+        return await self._search_curriculum(user_text)
+
+    async def _search_curriculum(self, query: str) -> list[dict]:
+        return await curriculum_retriever.retrieve(
+            query=query,
             course_id=self.course.get("id"),
             top_k=5,
+            session_id=self.session_id,
         )
 
-        self.conversation_history.append({
-            "role": "student",
-            "content": user_text,
-            "sentiment": sentiment,
-            "timestamp": datetime.utcnow().isoformat(),
-        })
-
-        context_message = self._build_context_message(context_chunks, sentiment)
-        return context_message
+    def memory_bytes(self) -> int:
+        """Approximate memory held by this session's own state."""
+        return (
+            self.conversation_history.memory_bytes()
+            + self.context_window.memory_bytes()
+            + self.prosody.memory_bytes()
+            + self.learner.memory_bytes()
+            + curriculum_retriever.session_memory_bytes(self.session_id)
+        )
 
     def _build_context_message(self, context_chunks, sentiment):
         """Build a context injection message for the LLM."""
-        parts = []
-
-        if context_chunks:
-            parts.append("RELEVANT CURRICULUM CONTEXT:")
-            for chunk in context_chunks:
-                parts.append(f"- [{chunk.get('type', 'text')}] {chunk.get('content', '')}")
-
-        if sentiment and sentiment != "neutral":
-            parts.append(f"\nSTUDENT SENTIMENT: {sentiment}")
-            if sentiment == "confused":
-                parts.append("INSTRUCTION: Simplify your explanation. Use an analogy or example.")
-            elif sentiment == "frustrated":
-                parts.append("INSTRUCTION: Be encouraging. Break the problem into smaller steps.")
-            elif sentiment == "bored":
-                parts.append("INSTRUCTION: Make it more engaging. Ask a thought-provoking question.")
-
-        if self.current_objective:
-            parts.append(f"\nCURRENT LEARNING OBJECTIVE: {self.current_objective}")
-
-        return "\n".join(parts) if parts else None
+        message, stats = build_context_message(
+            context_chunks,
+            sentiment,
+            self.current_objective,
+            self.context_window,
+            context_assembler,
+        )
+        if stats:
+            self.context_tokens_saved += stats["tokens_saved"]
+            logger.debug(f"Context assembly: {stats}")
+        return message
 
 
 @function_tool
+@traced(tracer, "tool.generate_quiz")
 async def generate_quiz(
     context: RunContext,
     topic: str,
@@ -126,11 +286,13 @@ async def generate_quiz(
         difficulty=difficulty,
         num_questions=num_questions,
         course_context=context.agent.course,
+        student_id=context.agent.student.get("id"),
     )
     return json.dumps(quiz)
 
 
 @function_tool
+@traced(tracer, "tool.check_understanding")
 async def check_understanding(
     context: RunContext,
     concept: str,
@@ -145,12 +307,17 @@ async def check_understanding(
     assessment = await pedagogy_engine.evaluate_understanding(
         concept=concept,
         student_explanation=student_explanation,
-        bloom_level=context.agent.current_objective,
+        bloom_level=context.agent.target_level.name if context.agent.target_level else None,
+    )
+    context.agent.record_assessment(
+        context.agent.current_objective_id,
+        1.0 if assessment["understanding_level"] == "good" else 0.5,
     )
     return json.dumps(assessment)
 
 
 @function_tool
+@traced(tracer, "tool.show_visual")
 async def show_visual(
     context: RunContext,
     visual_type: str,
@@ -171,6 +338,7 @@ async def show_visual(
 
 
 @function_tool
+@traced(tracer, "tool.update_progress")
 async def update_progress(
     context: RunContext,
     objective_id: str,
@@ -184,6 +352,15 @@ async def update_progress(
         status: NOT_STARTED, IN_PROGRESS, MASTERED, NEEDS_REVIEW
         score: Optional score 0-100
     """
+    # Queued for the background flusher; never waits on the API.
+    await progress_tracker.update(
+        student_id=context.agent.student.get("id"),
+        objective_id=objective_id,
+        status=status,
+        score=score,
+    )
+    if score is not None:
+        context.agent.record_assessment(objective_id, score / 100)
     return json.dumps({
         "action": "update_progress",
         "objective_id": objective_id,
@@ -194,6 +371,8 @@ async def update_progress(
 
 
 @function_tool
+@traced(tracer, "tool.lookup_curriculum")
+@tool_cache.memoize("lookup_curriculum", scope="process", version=curriculum_retriever.index_version)
 async def lookup_curriculum(
     context: RunContext,
     query: str,
@@ -207,6 +386,7 @@ async def lookup_curriculum(
         query=query,
         course_id=context.agent.course.get("id"),
         top_k=3,
+        session_id=context.agent.session_id,
     )
     return json.dumps([{
         "content": c.get("content", ""),
@@ -215,17 +395,113 @@ async def lookup_curriculum(
     } for c in chunks])
 
 
+def load_plugins():
+    """Import the LiveKit plugins. They register themselves, which must happen on a main thread."""
+    from livekit.plugins import silero, deepgram, cartesia, openai
+    return silero, deepgram, cartesia, openai
+
+
+def warm_shared_resources() -> dict:
+    """Touch the per-process singletons so the first session does not pay for them."""
+    warmed = {"keyword_hits": sentiment_analyzer.keyword_hits("warm up the matcher")}
+    if curriculum_retriever.local_index is not None:
+        warmed["index_chunks"] = curriculum_retriever.local_index.warm()
+    if curriculum_retriever.lexical_index is not None:
+        warmed["lexical_terms"] = curriculum_retriever.lexical_index.warm()
+    if curriculum_retriever.embeddings.cache is not None:
+        curriculum_retriever.embeddings.cache.db
+    if curriculum_retriever.embeddings.local is None:
+        curriculum_retriever.embeddings.client
+    progress_tracker.client
+    return warmed
+
+
+def shared_vad():
+    """The process's Silero VAD, loaded once; its model is read-only and serves every session."""
+    global _vad
+    with _vad_lock:
+        if _vad is None:
+            silero, _, _, _ = load_plugins()
+            _vad = silero.VAD.load()
+        return _vad
+
+
+def prewarm(proc: JobProcess):
+    """Runs before a job process accepts work (before every job in multi-session mode).
+
+    Everything it loads is process-wide, so only the first call pays for it.
+    """
+    proc.userdata["vad"] = shared_vad()
+    logger.info(f"Process prewarmed: {warm_shared_resources()}")
+    port = tracer.serve()
+    if port:
+        logger.info(f"Stage latency metrics on :{port}/metrics")
+
+
+def trace_session(session: AgentSession, session_id: str):
+    """Record the session's own STT/LLM/TTS metrics and end-to-end turn latency."""
+    user_stopped = None
+
+    @session.on("metrics_collected")
+    def _on_metrics(event):
+        m = event.metrics
+        if m.type == "stt_metrics":
+            tracer.record("stt", m.duration * 1000, session_id=session_id)
+        elif m.type == "eou_metrics":
+            tracer.record("eou.end_of_utterance", m.end_of_utterance_delay * 1000, session_id=session_id)
+            tracer.record("eou.transcription", m.transcription_delay * 1000, session_id=session_id)
+        elif m.type == "llm_metrics":
+            tracer.record("llm.first_token", m.ttft * 1000, session_id=session_id)
+            tracer.record("llm.total", m.duration * 1000, session_id=session_id)
+        elif m.type == "tts_metrics":
+            tracer.record("tts.first_byte", m.ttfb * 1000, session_id=session_id)
+        elif m.type == "vad_metrics" and m.inference_count:
+            tracer.record("vad.inference", m.inference_duration_total / m.inference_count * 1000, session_id=session_id)
+
+    @session.on("user_state_changed")
+    def _on_user_state(event):
+        nonlocal user_stopped
+        if event.old_state == "speaking" and event.new_state == "listening":
+            user_stopped = time.perf_counter_ns()
+
+    @session.on("agent_state_changed")
+    def _on_agent_state(event):
+        nonlocal user_stopped
+        if event.new_state == "speaking" and user_stopped is not None:
+            tracer.record("turn.end_to_end", (time.perf_counter_ns() - user_stopped) / 1e6, session_id=session_id)
+            user_stopped = None
+
+
 async def entrypoint(ctx: JobContext):
     """Main entrypoint when a student starts a session."""
+    _, deepgram, cartesia, openai = load_plugins()
+    vad = ctx.proc.userdata.get("vad") or shared_vad()
+
     await ctx.connect()
 
     room_metadata = json.loads(ctx.room.metadata or "{}")
     session_config = room_metadata.get("session_config", {})
 
-    agent = EduAvatarAgent(session_config=session_config)
+    started = time.perf_counter()
+    # A reconnect comes in a new room, so the snapshot is found by student and course.
+    snapshot_key = SnapshotStore.key(
+        session_config.get("student", {}).get("id"),
+        session_config.get("course", {}).get("id"),
+    )
+    snapshot = snapshot_store.load(snapshot_key)
+    agent = EduAvatarAgent(session_config=session_config, snapshot=snapshot, snapshot_key=snapshot_key)
+    if snapshot is not None:
+        logger.info(
+            f"Resumed session {agent.session_id} with {len(agent.conversation_history)} turns "
+            f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+    admission.open(agent.session_id, agent.memory_bytes)
+    # Fill this course's quiz banks while the session warms up; banked topics are skipped.
+    pedagogy_engine.question_bank.schedule(agent.course.get("id"), course_topics(agent.course))
 
+    # Plugin clients hold connections bound to this job's event loop, so each session has its own.
     session = AgentSession(
-        vad=silero.VAD.load(),
+        vad=vad,
         stt=deepgram.STT(
             model="nova-3",
             language=session_config.get("language", "en"),
@@ -243,10 +519,86 @@ async def entrypoint(ctx: JobContext):
                update_progress, lookup_curriculum],
     )
 
+    trace_session(session, agent.session_id)
+
+    @session.on("user_input_transcribed")
+    def _on_transcript(event):
+        agent.prefetcher.observe(event.transcript, is_final=event.is_final)
+
+    @session.on("user_state_changed")
+    def _on_user_speech(event):
+        # Bound the turn's prosody to the student's own speech.
+        if event.new_state == "speaking":
+            agent.prosody.speech_started()
+        elif event.old_state == "speaking":
+            agent.prosody.speech_ended()
+
+    @session.on("conversation_item_added")
+    def _on_conversation_item(event):
+        text = getattr(event.item, "text_content", None)
+        if text and getattr(event.item, "role", None) == "assistant":
+            agent.record_turn("tutor", text)
+
+    @ctx.room.on("data_received")
+    def _on_data(packet):
+        try:
+            message = json.loads(packet.data)
+        except ValueError:
+            return
+        if isinstance(message, dict) and message.get("type") == "end_session":
+            agent.lesson_ended = True
+
+    @session.on("close")
+    def _on_close(event):
+        logger.info(f"Speculative retrieval: {agent.prefetcher.metrics()}")
+        logger.info(f"Query cache: {curriculum_retriever.end_session(agent.session_id)}")
+        logger.info(f"Context tokens saved: {agent.context_tokens_saved}, window: {agent.context_window.stats()}")
+        logger.info(f"Stage latency: {tracer.summary()}")
+        tool_cache.invalidate(session_id=agent.session_id)
+        logger.info(f"Tool cache: {tool_cache.stats()}")
+        logger.info(f"Session usage: {admission.close(agent.session_id)}, worker: {admission.stats()}")
+        learner_store.save(agent.student.get("id"), agent.course.get("id"), agent.learner)
+        if agent.snapshots is not None and agent.lesson_ended:
+            # Only an explicit end of the lesson drops the snapshot; after a
+            # disconnect or an error the student's next session resumes from it.
+            agent.snapshots.discard()
+        # Send this session's progress now instead of on the next flush tick.
+        asyncio.ensure_future(progress_tracker.flush())
+        tracer.flush()
+
+    async def _flush_progress():
+        # The job does not exit until its last progress updates are sent or journaled
+        # and its trace records are written.
+        await progress_tracker.flush()
+        await asyncio.to_thread(tracer.flush, wait=True)
+
+    ctx.add_shutdown_callback(_flush_progress)
+
     await session.start(room=ctx.room, agent=agent)
 
     logger.info(f"Session started for student {session_config.get('student', {}).get('id')}")
 
 
+def worker_options() -> WorkerOptions:
+    """One job process per room by default; with AGENT_MULTI_SESSION=on, many rooms per process.
+
+    In multi-session mode jobs run as threads of this process and share its
+    pools, and the admission controller sets the load and turns jobs away
+    once measured capacity is reached. Run one worker per core: the job
+    threads share one interpreter.
+    """
+    if not shared_loop.enabled:
+        return WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm)
+    return WorkerOptions(
+        entrypoint_fnc=entrypoint,
+        prewarm_fnc=prewarm,
+        job_executor_type=JobExecutorType.THREAD,
+        request_fnc=admission.request_fnc,
+        load_fnc=admission.load,
+        load_threshold=1.0,
+    )
+
+
 if __name__ == "__main__":
-    cli.run_app(entrypoint)
+    load_plugins()
+    cli.run_app(worker_options())
@@ -0,0 +1,80 @@
+"""Embedding throughput: one request per text vs pooled, batched, concurrent requests.
+
+Run from apps/agent:  python -m benchmarks.bench_embeddings --chunks 2000
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.standins import StandInServer, embeddings_handler
+from rag.embeddings import EmbeddingGenerator
+
+
+async def embed_one_by_one(base_url: str, texts: list[str]) -> int:
+    """The previous behaviour: a fresh client and request for every text, no retries."""
+    done = 0
+    for text in texts:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{base_url}/embeddings",
+                json={"input": text, "model": "text-embedding-3-small"},
+            )
+            if response.status_code == 200:
+                done += len(response.json()["data"])
+    return done
+
+
+async def embed_batched(texts: list[str], batch_size: int, concurrency: int) -> int:
+    generator = EmbeddingGenerator(max_batch_size=batch_size, max_concurrency=concurrency)
+    try:
+        results = await generator.generate_batch(texts)
+    finally:
+        await generator.aclose()
+    return sum(r is not None for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--baseline-chunks", type=int, default=200,
+                        help="texts for the slow one-by-one path")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate-limit-every", type=int, default=0,
+                        help="answer every Nth request with 429")
+    args = parser.parse_args()
+
+    texts = [f"chunk {i}: photosynthesis converts light energy into chemical energy"
+             for i in range(args.chunks)]
+    handler = embeddings_handler(
+        dim=args.dim,
+        latency=args.latency_ms / 1000,
+        rate_limit_every=args.rate_limit_every,
+    )
+
+    with StandInServer(handler) as server:
+        os.environ["OPENAI_API_KEY"] = "bench"
+        os.environ["OPENAI_BASE_URL"] = server.url
+        os.environ["EMBEDDING_CACHE"] = "off"
+
+        start = time.perf_counter()
+        n = asyncio.run(embed_one_by_one(server.url, texts[: args.baseline_chunks]))
+        before = n / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        n = asyncio.run(embed_batched(texts, args.batch_size, args.concurrency))
+        after = n / (time.perf_counter() - start)
+
+        print(f"one-by-one : {before:10.1f} chunks/sec")
+        print(f"batched    : {after:10.1f} chunks/sec  ({after / before:.1f}x)")
+        print(f"stand-in   : {handler.stats['requests']} requests, {handler.stats['inputs']} inputs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Memory held by one session's conversation history: list of dicts vs ConversationHistory.
+
+Run from apps/agent:  python -m benchmarks.bench_history --turns 2000
+"""
+
+import argparse
+import random
+import tracemalloc
+from datetime import datetime
+
+from session.history import SENTIMENTS, ConversationHistory
+
+WORDS = (
+    "so what happens to the energy when light hits the leaf and why do plants need "
+    "water i think it is because the chlorophyll absorbs red and blue light"
+).split()
+
+
+def utterances(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(5, 40))) for _ in range(n)]
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    # Copy each text so both stores pay for their own strings.
+    texts = utterances(args.turns)
+    sentiments = [SENTIMENTS[i % len(SENTIMENTS)] for i in range(args.turns)]
+
+    def as_dicts():
+        history = []
+        for text, sentiment in zip(texts, sentiments):
+            history.append({
+                "role": "student",
+                "content": "".join(text),
+                "sentiment": sentiment,
+                "timestamp": datetime.utcnow().isoformat(),
+            })
+        return history
+
+    def compact():
+        history = ConversationHistory()
+        for text, sentiment in zip(texts, sentiments):
+            history.append("student", "".join(text), sentiment)
+        return history
+
+    print(f"{args.turns} turns")
+    print(f"  list of dicts       : {measure(as_dicts) / 1024:8.1f} KiB")
+    print(f"  ConversationHistory : {measure(compact) / 1024:8.1f} KiB "
+          f"(cap {ConversationHistory().max_bytes / 1024:.0f} KiB of turns)")
+
+
+if __name__ == "__main__":
+    main()
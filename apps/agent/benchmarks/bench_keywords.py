@@ -0,0 +1,93 @@
+"""Keyword classification: one `in` scan per keyword vs the single-pass KeywordMatcher.
+
+Run from apps/agent:  python -m benchmarks.bench_keywords --keywords-per-category 2000
+"""
+
+import argparse
+import random
+import time
+
+from pedagogy.assessment import AssessmentGenerator
+from sentiment.analyzer import SentimentAnalyzer
+from utils.keywords import KeywordMatcher
+
+TERMS = [
+    "photosynthesis", "chlorophyll", "mitochondria", "osmosis", "diffusion", "enzyme",
+    "velocity", "acceleration", "momentum", "newton", "friction", "inertia", "quadratic",
+    "derivative", "integral", "polynomial", "fraction", "denominator", "hypotenuse",
+    "molecule", "covalent", "ionic", "oxidation", "catalyst", "equilibrium", "isotope",
+    "democracy", "revolution", "colonialism", "monsoon", "latitude", "erosion", "sediment",
+]
+MODIFIERS = [
+    "what is", "i don't get", "explain", "how does", "the law of", "chapter", "formula for",
+    "example of", "why is", "definition of", "unit", "compare", "the role of", "i love",
+]
+FILLER = (
+    "so um i was reading the chapter and i think because the teacher said it "
+    "but i'm not really sure how it works when you compare it to the other one"
+).split()
+
+
+def curriculum_keywords(categories: int, per_category: int, seed: int = 0) -> dict[str, list[str]]:
+    rng = random.Random(seed)
+    return {
+        f"topic_{c}": [
+            f"{rng.choice(MODIFIERS)} {rng.choice(TERMS)} {rng.randint(1, 99)}"
+            for _ in range(per_category)
+        ]
+        for c in range(categories)
+    }
+
+
+def utterances(n: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        words = rng.sample(FILLER, rng.randint(6, 25))
+        words.insert(rng.randrange(len(words)), f"{rng.choice(MODIFIERS)} {rng.choice(TERMS)}")
+        out.append(" ".join(words))
+    return out
+
+
+def naive_counts(categories: dict[str, list[str]], text: str) -> dict[str, int]:
+    """The previous approach: a substring test per keyword."""
+    text = text.lower()
+    return {c: sum(1 for k in keywords if k in text) for c, keywords in categories.items()}
+
+
+def timed(fn, texts: list[str]) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return (time.perf_counter() - start) / len(texts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--categories", type=int, default=6)
+    parser.add_argument("--keywords-per-category", type=int, default=2000)
+    parser.add_argument("--utterances", type=int, default=2000)
+    args = parser.parse_args()
+
+    texts = utterances(args.utterances)
+    keywords = curriculum_keywords(args.categories, args.keywords_per_category)
+    total = sum(len(k) for k in keywords.values())
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(keywords)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(f"{total} curriculum keywords, matcher built in {build_ms:.1f} ms")
+    print(f"  per-keyword `in` : {timed(lambda t: naive_counts(keywords, t), texts):9.1f} us/utterance")
+    print(f"  KeywordMatcher   : {timed(matcher.counts, texts):9.1f} us/utterance")
+
+    analyzer = SentimentAnalyzer()
+    assessor = AssessmentGenerator()
+    print("built-in keyword sets")
+    print(f"  sentiment naive  : {timed(lambda t: naive_counts(analyzer.SENTIMENT_KEYWORDS, t), texts):9.1f} us/utterance")
+    print(f"  sentiment matcher: {timed(analyzer.keyword_hits, texts):9.1f} us/utterance")
+    print(f"  bloom depth      : {timed(assessor.evaluate_response_depth, texts):9.1f} us/utterance")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""ProgressTracker against a local stub API: update() latency, batching, and journal replay.
+
+Run from apps/agent:  python -m benchmarks.bench_progress --updates 500
+
+Exits with an AssertionError if an update is lost, arrives stale or with the
+wrong attempt count, or the journal is not replayed and cleaned up.
+"""
+
+import argparse
+import asyncio
+import glob
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.standins import JSONHandler, StandInServer
+from tools.progress import ProgressTracker, try_lock
+
+SECRET = "bench-secret"
+
+
+def progress_handler(latency: float = 0.03):
+    """Stub for POST /api/sessions/progress (see apps/web) that can be switched to fail."""
+    state = {"requests": 0, "updates": 0, "latest": {}, "attempts": {}, "down": False, "lock": threading.Lock()}
+
+    class ProgressHandler(JSONHandler):
+        stats = state
+
+        def do_POST(self):
+            body = self.read_json()
+            time.sleep(latency)
+            if state["down"]:
+                self.send_json(503, {"error": "unavailable"})
+                return
+            if self.headers.get("Authorization") != f"Bearer {SECRET}":
+                self.send_json(401, {"error": "Unauthorized"})
+                return
+            if self.path != "/api/sessions/progress" or not isinstance(body.get("updates"), list):
+                self.send_json(400, {"error": "Invalid progress update"})
+                return
+            with state["lock"]:
+                state["requests"] += 1
+                state["updates"] += len(body["updates"])
+                for update in body["updates"]:
+                    key = (update["studentId"], update["objectiveId"])
+                    state["latest"][key] = (update["status"], update["score"])
+                    state["attempts"][key] = state["attempts"].get(key, 0) + update["attempts"]
+            self.send_json(200, {"received": len(body["updates"])})
+
+    return ProgressHandler
+
+
+async def run(args, url: str, handler) -> None:
+    os.environ["API_URL"] = url
+    os.environ["AGENT_API_SECRET"] = SECRET
+    journal = os.path.join(tempfile.mkdtemp(), "progress.journal")
+    tracker = ProgressTracker(flush_interval=0.2, max_batch=args.max_batch, journal_path=journal)
+    own_journal = f"{journal}.{tracker.worker_id}"
+
+    expected = {}
+    attempts = {}
+    start = time.perf_counter()
+    for i in range(args.updates):
+        key = (f"student-{i % args.students}", f"obj-{i % args.objectives}")
+        await tracker.update(*key, "IN_PROGRESS", i)
+        expected[key] = ("IN_PROGRESS", i)
+        attempts[key] = attempts.get(key, 0) + 1
+    enqueue_us = (time.perf_counter() - start) / args.updates * 1e6
+    assert await tracker.flush(), "flush failed with the API up"
+    print(f"{args.updates} updates: {enqueue_us:.1f} us per update() call")
+    print(f"  stub received {handler.stats['requests']} requests carrying "
+          f"{handler.stats['updates']} merged updates; tracker {tracker.stats()}")
+    assert handler.stats["latest"] == expected, "stub does not hold the latest update for every objective"
+    assert handler.stats["attempts"] == attempts, "merged updates lost or inflated attempts"
+    assert handler.stats["updates"] <= args.updates
+    assert tracker.stats()["pending"] == 0
+
+    handler.stats["down"] = True
+    for i in range(20):
+        await tracker.update("student-x", f"obj-{i}", "IN_PROGRESS", 50)
+    assert not await tracker.flush(), "flush reported success with the API down"
+    for i in range(20):
+        await tracker.update("student-x", f"obj-{i}", "MASTERED", 100)
+    assert not await tracker.flush(), "flush reported success with the API down"
+    journaled = sum(1 for _ in open(own_journal))
+    print(f"  API down: journal holds {journaled} updates")
+    assert journaled == 40
+    assert ("student-x", "obj-0") not in handler.stats["latest"]
+
+    # A journal left by an exited worker (no lock held) is taken over; a live worker's is left alone.
+    orphan = f"{journal}.exitedworker"
+    with open(orphan, "w") as f:
+        f.write('{"studentId": "student-y", "objectiveId": "obj-0", "status": "MASTERED", "score": 90, "attempts": 3}\n')
+    live = f"{journal}.liveworker"
+    live_lock = try_lock(f"{live}.lock")
+    with open(live, "w") as f:
+        f.write('{"studentId": "student-z", "objectiveId": "obj-0", "status": "MASTERED", "score": 80, "attempts": 1}\n')
+
+    handler.stats["down"] = False
+    requests_before = handler.stats["requests"]
+    assert await tracker.flush(), "journal replay failed with the API back up"
+    replayed = handler.stats["requests"] - requests_before
+    remaining = sorted(os.path.basename(p) for p in glob.glob(journal + "*"))
+    print(f"  API back: replayed in {replayed} request, journal files left: {remaining}")
+    assert replayed == 1
+    assert all(handler.stats["latest"][("student-x", f"obj-{i}")] == ("MASTERED", 100) for i in range(20))
+    assert all(handler.stats["attempts"][("student-x", f"obj-{i}")] == 2 for i in range(20))
+    assert handler.stats["latest"][("student-y", "obj-0")] == ("MASTERED", 90), "orphaned journal not replayed"
+    assert handler.stats["attempts"][("student-y", "obj-0")] == 3
+    assert ("student-z", "obj-0") not in handler.stats["latest"], "replayed a live worker's journal"
+    assert remaining == sorted(os.path.basename(p) for p in (live, f"{live}.lock", f"{own_journal}.lock"))
+    os.close(live_lock)
+    await tracker.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--students", type=int, default=10)
+    parser.add_argument("--objectives", type=int, default=20)
+    parser.add_argument("--max-batch", type=int, default=50)
+    args = parser.parse_args()
+
+    handler = progress_handler()
+    with StandInServer(handler) as server:
+        asyncio.run(run(args, server.url, handler))
+
+
+if __name__ == "__main__":
+    main()
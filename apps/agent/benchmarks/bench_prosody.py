@@ -0,0 +1,53 @@
+"""Prosody extraction cost per 10 ms audio frame, and rooms one CPU core can keep up with.
+
+Run from apps/agent:  python -m benchmarks.bench_prosody --seconds 30
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from sentiment.prosody import ProsodyExtractor
+
+
+def synthetic_speech(sample_rate: int, seconds: float, seed: int = 0) -> np.ndarray:
+    """Voiced syllables with a wandering pitch, pauses and background noise, as int16 PCM."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / sample_rate
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 2
+    phrases = (np.sin(2 * np.pi * 0.2 * t) > -0.5).astype(np.float64)
+    signal = 0.25 * syllables * phrases * (np.sin(phase) + 0.4 * np.sin(2 * phase))
+    signal += rng.normal(0, 0.002, signal.shape)
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--frame-ms", type=int, default=10)
+    args = parser.parse_args()
+
+    for sample_rate in (16000, 48000):
+        pcm = synthetic_speech(sample_rate, args.seconds)
+        frame = sample_rate * args.frame_ms // 1000
+        frames = [pcm[i : i + frame].tobytes() for i in range(0, len(pcm) - frame + 1, frame)]
+
+        extractor = ProsodyExtractor(sample_rate)
+        start = time.process_time()
+        for data in frames:
+            extractor.push(data)
+        cpu = time.process_time() - start
+
+        audio_seconds = len(frames) * args.frame_ms / 1000
+        features = {k: round(float(v), 2) for k, v in extractor.turn_features().items()}
+        print(f"{sample_rate // 1000} kHz: {cpu / len(frames) * 1e6:6.1f} us/frame, "
+              f"real-time factor {cpu / audio_seconds:.4f}, "
+              f"~{audio_seconds / cpu:.0f} rooms per core")
+        print(f"  features: {features}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Quantized local index: recall@k against exact float32 search, query time and scanned bytes.
+
+Run from apps/agent:  python -m benchmarks.bench_quantization --chunks 20000 --dim 1536
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from rag.local_index import LocalVectorIndex, normalize, top_indices
+
+COURSE = "bench-course"
+
+
+def clustered_vectors(n: int, dim: int, topics: int, seed: int = 0) -> np.ndarray:
+    """Unit vectors grouped around topic centroids, so neighbours are close calls like real chunks."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((topics, dim), dtype=np.float32)
+    members = rng.integers(0, topics, n)
+    return normalize(centroids[members] + 0.8 * rng.standard_normal((n, dim), dtype=np.float32))
+
+
+def build(index_dir: str, quantization: str, vectors: np.ndarray, rerank_factor: int) -> LocalVectorIndex:
+    index = LocalVectorIndex(index_dir, quantization=quantization, rerank_factor=rerank_factor)
+    index.upsert(COURSE, [{"id": f"chunk-{i}"} for i in range(len(vectors))], vectors)
+    index.warm()
+    return index
+
+
+def scanned_bytes(index: LocalVectorIndex) -> int:
+    """Bytes every query reads, i.e. what stays resident once the index is warm."""
+    shard = index._shard(COURSE)
+    if shard.codes is None:
+        return shard.vectors.nbytes
+    return shard.codes.nbytes + (shard.scales.nbytes if shard.scales is not None else 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--topics", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    vectors = clustered_vectors(args.chunks, args.dim, args.topics)
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, args.chunks, args.queries)
+    queries = normalize(vectors[picks] + 0.8 * rng.standard_normal((args.queries, args.dim), dtype=np.float32))
+    truth = [set(top_indices(vectors @ q, args.top_k).tolist()) for q in queries]
+
+    print(f"{args.chunks} chunks x {args.dim} dims, {args.queries} queries, recall@{args.top_k} vs exact float32")
+    print(f"  {'storage':10s} {'rerank':>6s} {'recall':>8s} {'us/query':>10s} {'scanned MiB':>12s}")
+    for quantization, factors in (("off", [1]), ("float16", [1, 4]), ("int8", [1, 4, 8, 16])):
+        with tempfile.TemporaryDirectory() as index_dir:
+            index = build(index_dir, quantization, vectors, factors[0])
+            for factor in factors:
+                index.rerank_factor = factor
+                start = time.perf_counter()
+                results = [index.search(q, COURSE, args.top_k) for q in queries]
+                elapsed = (time.perf_counter() - start) / args.queries
+                recall = np.mean([
+                    len({int(c["id"].split("-")[1]) for c in found} & expected) / args.top_k
+                    for found, expected in zip(results, truth)
+                ])
+                rerank = "-" if quantization == "off" else f"{factor}x"
+                print(f"  {quantization:10s} {rerank:>6s} {recall:8.3f} {elapsed * 1e6:10.1f} "
+                      f"{scanned_bytes(index) / 2**20:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Cold start: module import times and first-session time-to-greeting, cold vs prewarmed.
+
+Run from apps/agent:  python -m benchmarks.bench_startup
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+
+MODULES = (
+    "numpy",
+    "httpx",
+    "rag.retriever",
+    "sentiment.analyzer",
+    "livekit.agents",
+    "livekit.plugins.silero",
+    "livekit.plugins.deepgram",
+    "livekit.plugins.openai",
+    "livekit.plugins.cartesia",
+    "agent",
+)
+
+
+def import_time(module: str) -> float:
+    """Seconds to import ``module`` in a fresh interpreter, or -1 if it is unavailable."""
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return -1.0
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+class StandInProcess:
+    """Just enough of JobProcess for prewarm()."""
+
+    def __init__(self):
+        self.userdata: dict = {}
+
+
+def time_to_greeting(agent_module, userdata: dict) -> float:
+    """What entrypoint does before the greeting can be spoken: plugins, VAD, agent construction."""
+    start = time.perf_counter()
+    silero, _, _, _ = agent_module.load_plugins()
+    if userdata.get("vad") is None:
+        userdata["vad"] = silero.VAD.load()
+    agent_module.EduAvatarAgent({"persona": {"name": "Ada"}, "student": {"name": "Sam"}}).greeting()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=3)
+    args = parser.parse_args()
+
+    print("import time (fresh interpreter)")
+    for module in MODULES:
+        seconds = import_time(module)
+        shown = "unavailable" if seconds < 0 else f"{seconds * 1000:8.1f} ms"
+        print(f"  {module:28s} {shown}")
+
+    try:
+        import agent
+    except ImportError as e:
+        print(f"time-to-greeting skipped: {e}")
+        return
+
+    cold = time_to_greeting(agent, {})
+    print(f"time-to-greeting, cold process : {cold * 1000:8.1f} ms")
+
+    proc = StandInProcess()
+    start = time.perf_counter()
+    agent.prewarm(proc)
+    print(f"prewarm (once per process)     : {(time.perf_counter() - start) * 1000:8.1f} ms")
+    for i in range(args.sessions):
+        warm = time_to_greeting(agent, proc.userdata)
+        print(f"time-to-greeting, session {i + 1}    : {warm * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
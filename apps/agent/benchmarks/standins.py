@@ -0,0 +1,98 @@
+"""Local HTTP stand-ins for the external services the agent talks to."""
+
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+
+def fake_embedding(text: str, dim: int) -> list[float]:
+    """Deterministic pseudo-embedding for a text."""
+    seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32).tolist()
+
+
+class StandInServer:
+    """Runs a ThreadingHTTPServer on a free localhost port in a background thread."""
+
+    def __init__(self, handler_class: type[BaseHTTPRequestHandler]):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StandInServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    """Keep-alive JSON request handler with quiet logging."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, Nagle plus
+    # delayed ACKs add ~40 ms to every keep-alive response.
+    disable_nagle_algorithm = True
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def send_json(self, status: int, body, headers: dict = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def embeddings_handler(
+    dim: int = 1536,
+    latency: float = 0.02,
+    per_input_latency: float = 0.0002,
+    rate_limit_every: int = 0,
+) -> type[BaseHTTPRequestHandler]:
+    """Build a handler mimicking POST /embeddings with fixed plus per-input latency."""
+    state = {"requests": 0, "inputs": 0, "lock": threading.Lock()}
+
+    class EmbeddingsHandler(JSONHandler):
+        stats = state
+
+        def do_POST(self):
+            body = self.read_json()
+            inputs = body["input"]
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            with state["lock"]:
+                state["requests"] += 1
+                state["inputs"] += len(inputs)
+                limited = rate_limit_every and state["requests"] % rate_limit_every == 0
+            if limited:
+                self.send_json(429, {"error": "rate limited"}, {"Retry-After": "0.05"})
+                return
+            time.sleep(latency + per_input_latency * len(inputs))
+            self.send_json(200, {
+                "data": [
+                    {"index": i, "embedding": fake_embedding(text, dim)}
+                    for i, text in enumerate(inputs)
+                ],
+            })
+
+    return EmbeddingsHandler
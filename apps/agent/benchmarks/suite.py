@@ -0,0 +1,352 @@
+"""Microbenchmarks for the agent's hot paths, compared against a stored baseline.
+
+Run from apps/agent:
+    python -m benchmarks.suite                      # run all, compare with baseline.json
+    python -m benchmarks.suite --only sentiment     # cases whose name contains "sentiment"
+    python -m benchmarks.suite --update-baseline    # record this machine's numbers as the baseline
+
+Everything runs offline: curriculum text and transcripts are synthetic, and
+retrieval uses a temporary local index whose query embeddings come from a
+localhost stand-in.
+Exits with status 1 if any case is slower than the baseline by more than
+``--threshold``.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from typing import Callable
+
+from benchmarks.standins import StandInServer, embeddings_handler, fake_embedding
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+EMBEDDING_DIM = 256
+
+TERMS = [
+    "photosynthesis", "chlorophyll", "mitochondria", "osmosis", "enzyme", "velocity",
+    "acceleration", "momentum", "friction", "quadratic", "derivative", "fraction",
+    "molecule", "catalyst", "equilibrium", "democracy", "erosion", "latitude",
+]
+STUDENT_PHRASES = [
+    "i don't understand why", "can you explain", "i think it's because", "what happens when",
+    "that's so cool", "this is boring", "ugh i keep getting", "so basically", "wait so",
+    "i would compare it to", "how would you design", "is it true that", "ok", "yeah",
+]
+FILLER = (
+    "the energy moves through the system and it depends on how much light or force "
+    "is applied so the result changes when you measure it again later in the lesson"
+).split()
+
+# name -> setup(env) returning run(n), which performs n operations.
+CASES: dict[str, Callable] = {}
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def transcripts(n: int, seed: int = 0) -> list[str]:
+    """Student utterances of 1 to 40 words mixing hedges, emotion words and curriculum terms."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        words = [rng.choice(STUDENT_PHRASES)]
+        words += rng.choices(FILLER + TERMS, k=rng.randint(0, 35))
+        out.append(" ".join(words))
+    return out
+
+
+def curriculum_text(words: int, seed: int = 0) -> str:
+    """Lesson-like prose, roughly one curriculum term per eight words."""
+    rng = random.Random(seed)
+    return " ".join(rng.choice(TERMS) if rng.random() < 0.125 else rng.choice(FILLER) for _ in range(words))
+
+
+def run_async(loop: asyncio.AbstractEventLoop, make_op: Callable[[int], object]) -> Callable[[int], None]:
+    """Turn an async per-item operation into a run(n) that awaits n of them in one loop pass."""
+    async def batch(n: int):
+        for i in range(n):
+            await make_op(i)
+
+    return lambda n: loop.run_until_complete(batch(n))
+
+
+@case("sentiment.analyze")
+def _sentiment(env: dict):
+    from sentiment.analyzer import SentimentAnalyzer
+    analyzer = SentimentAnalyzer()
+    texts = transcripts(1000)
+    return run_async(env["loop"], lambda i: analyzer.analyze(texts[i % len(texts)]))
+
+
+@case("assessment.evaluate_response_depth")
+def _depth(env: dict):
+    from pedagogy.assessment import AssessmentGenerator
+    generator = AssessmentGenerator()
+    texts = transcripts(1000, seed=1)
+
+    def run(n: int):
+        for i in range(n):
+            generator.evaluate_response_depth(texts[i % len(texts)])
+    return run
+
+
+@case("engine.generate_quiz")
+def _generate_quiz(env: dict):
+    """A quiz served from a pre-generated bank, as the tool call sees it after warm-up."""
+    from pedagogy.engine import PedagogicalEngine
+    from pedagogy.question_bank import QuestionBank
+    loop = env["loop"]
+    bank = QuestionBank(bank_dir=env["stack"].enter_context(tempfile.TemporaryDirectory()))
+    loop.run_until_complete(bank.fill("bench-course", TERMS))
+    engine = PedagogicalEngine(question_bank=bank)
+    difficulties = ["easy", "medium", "hard"]
+    # The bank draws with the module-level RNG; seed it so every run serves the same questions.
+    random.seed(7)
+    return run_async(loop, lambda i: engine.generate_quiz(
+        TERMS[i % len(TERMS)], difficulties[i % 3], 3, {"id": "bench-course"}, f"student-{i % 30}",
+    ))
+
+
+@case("indexer.chunk_text")
+def _chunk_text(env: dict):
+    from rag.indexer import DocumentIndexer
+    indexer = DocumentIndexer(backend="local")
+    text = curriculum_text(20_000)
+
+    def run(n: int):
+        for _ in range(n):
+            indexer.chunk_text(text)
+    return run
+
+
+@case("prompts.build_system_prompt")
+def _system_prompt(env: dict):
+    from pedagogy.prompts import build_system_prompt
+    students = [{"id": f"s{i}", "name": f"Student {i}", "gradeLevel": 5 + i % 7} for i in range(50)]
+    persona = {"name": "Ada", "personality": "warm and patient", "teachingStyle": "SOCRATIC"}
+    course = {"id": "bio-101", "title": "Biology", "subject": "Science"}
+
+    def run(n: int):
+        for i in range(n):
+            build_system_prompt(persona, students[i % len(students)], course, persona["teachingStyle"])
+    return run
+
+
+@case("session.build_context_message")
+def _context_message(env: dict):
+    from rag.context import ContextAssembler
+    from session.context_message import build_context_message
+    from session.context_window import ContextWindow
+    assembler = ContextAssembler()
+    window = ContextWindow()
+    rng = random.Random(2)
+    turns = [
+        [
+            {"id": f"c{rng.randint(0, 400)}", "content": curriculum_text(120, seed=rng.random()),
+             "type": "text", "source_file": f"module-{rng.randint(0, 9)}.md", "score": 1 - k / 10}
+            for k in range(5)
+        ]
+        for _ in range(200)
+    ]
+    sentiments = ["neutral", "confused", "frustrated", "bored", "engaged"]
+
+    def run(n: int):
+        for i in range(n):
+            build_context_message(turns[i % len(turns)], sentiments[i % 5], "obj-1", window, assembler)
+    return run
+
+
+@case("embeddings.local_generate")
+def _local_embeddings(env: dict):
+    """One query embedded by the offline backend, as retrieve() does per turn."""
+    from rag.embeddings import EmbeddingGenerator
+    generator = EmbeddingGenerator(backend="local")
+    texts = transcripts(1000, seed=5)
+    return run_async(env["loop"], lambda i: generator.generate(texts[i % len(texts)]))
+
+
+def _local_index(env: dict, chunks: int = 5000):
+    """A temporary on-disk course index of synthetic chunks, built once per suite run."""
+    if "index_dir" not in env:
+        from rag.local_index import LocalVectorIndex
+        env["index_dir"] = env["stack"].enter_context(tempfile.TemporaryDirectory())
+        index = LocalVectorIndex(env["index_dir"])
+        records = [
+            {"id": f"chunk-{i}", "content": curriculum_text(80, seed=i), "type": "text",
+             "source_file": f"module-{i % 20}.md"}
+            for i in range(chunks)
+        ]
+        index.upsert("bench-course", records, [fake_embedding(r["content"], EMBEDDING_DIM) for r in records])
+    return env["index_dir"]
+
+
+def _search_case(env: dict, quantization: str):
+    from rag.local_index import LocalVectorIndex
+    index = LocalVectorIndex(_local_index(env), quantization=quantization)
+    queries = [fake_embedding(t, EMBEDDING_DIM) for t in transcripts(200, seed=3)]
+
+    def run(n: int):
+        for i in range(n):
+            index.search(queries[i % len(queries)], course_id="bench-course", top_k=5)
+    return run
+
+
+@case("retriever.local_search")
+def _local_search(env: dict):
+    """Exact float32 scan, the reference the quantized case is compared with."""
+    return _search_case(env, "off")
+
+
+@case("retriever.local_search_int8")
+def _local_search_int8(env: dict):
+    """int8 scan plus float32 re-rank (RAG_QUANTIZATION=int8, for shards too large to keep in memory)."""
+    return _search_case(env, "int8")
+
+
+@case("retriever.retrieve")
+def _retrieve(env: dict):
+    """retrieve() with query embeddings already cached, so the localhost stand-in's HTTP cost stays out.
+
+    Vector search runs on float32 so the case measures BM25 fusion, not the quantized scan.
+    """
+    from rag.retriever import CurriculumRetriever
+    index_dir = _local_index(env)
+    server = env["stack"].enter_context(StandInServer(embeddings_handler(dim=EMBEDDING_DIM, latency=0)))
+    os.environ.update({
+        "RAG_INDEX_DIR": index_dir,
+        "RAG_QUANTIZATION": "off",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": server.url,
+        "EMBEDDING_CACHE": "on",
+        "EMBEDDING_CACHE_PATH": os.path.join(index_dir, "embeddings.sqlite"),
+    })
+    retriever = CurriculumRetriever(backend="local")
+    loop = env["loop"]
+    env["stack"].callback(lambda: loop.run_until_complete(retriever.embeddings.aclose()))
+    texts = transcripts(1000, seed=4)
+    loop.run_until_complete(retriever.embeddings.generate_batch(texts))
+    return run_async(loop, lambda i: retriever.retrieve(texts[i % len(texts)], "bench-course"))
+
+
+def measure(run: Callable[[int], None], repeats: int, min_time: float) -> dict:
+    """Calibrate a batch size that takes at least min_time, then time `repeats` batches.
+
+    The fastest batch is reported, as timeit does: slower ones measure other
+    load on the machine rather than the code.
+    """
+    run(1)  # warm caches and lazy initialisation
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _timed(run, repeats, min_time)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def _timed(run: Callable[[int], None], repeats: int, min_time: float) -> dict:
+    n = 1
+    while True:
+        start = time.perf_counter()
+        run(n)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        n *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    samples = [elapsed / n]
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        run(n)
+        samples.append((time.perf_counter() - start) / n)
+    samples.sort()
+    return {
+        "us_per_op": round(samples[0] * 1e6, 3),
+        "median_us": round(samples[len(samples) // 2] * 1e6, 3),
+        "ops_per_batch": n,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Names of cases slower than the baseline by more than threshold (a fraction)."""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            print(f"  {name:38s} {result['us_per_op']:12.3f} us   (no baseline)")
+            continue
+        change = result["us_per_op"] / before["us_per_op"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"  {name:38s} {result['us_per_op']:12.3f} us  {before['us_per_op']:12.3f} us  {change:+7.1%}  {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", default="", help="run cases whose name contains this")
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timed batch")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, e.g. 0.25 = 25%%")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    names = [name for name in CASES if args.only in name]
+    results: dict[str, dict] = {}
+    loop = asyncio.new_event_loop()
+    with ExitStack() as stack:
+        env = {"loop": loop, "stack": stack}
+        for name in names:
+            results[name] = measure(CASES[name](env), args.repeats, args.min_time)
+            print(f"  {name:38s} {results[name]['us_per_op']:12.3f} us/op", file=sys.stderr)
+    loop.close()
+
+    report = {
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}",
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        report["results"] = {**baseline.get("results", {}), **results}
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(f"{'case':40s} {'now':>15s} {'baseline':>15s}  change   (baseline from {baseline.get('machine', 'none')})")
+    regressions = compare(results, baseline.get("results", {}), args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,20 @@
 """Assessment and quiz generation utilities."""
 
 from typing import Optional
+from utils.keywords import KeywordMatcher
 from .bloom import BloomLevel, BLOOM_VERBS
 
 
+DEPTH_INDICATORS = {
+    BloomLevel.CREATE: ["i would design", "my proposal", "i could build", "new approach"],
+    BloomLevel.EVALUATE: ["i think because", "the best", "i agree", "i disagree", "however"],
+    BloomLevel.ANALYZE: ["compared to", "the difference", "because", "the reason", "relationship"],
+    BloomLevel.APPLY: ["for example", "if we", "we can use", "this means"],
+}
+
+DEPTH_MATCHER = KeywordMatcher(DEPTH_INDICATORS)
+
+
 class AssessmentGenerator:
     """Generates assessments aligned with learning objectives."""
 
@@ -36,21 +47,11 @@ class AssessmentGenerator:
         if word_count < 5:
             return BloomLevel.REMEMBER
 
-        create_indicators = ["i would design", "my proposal", "i could build", "new approach"]
-        if any(ind in response_lower for ind in create_indicators):
-            return BloomLevel.CREATE
-
-        eval_indicators = ["i think because", "the best", "i agree", "i disagree", "however"]
-        if any(ind in response_lower for ind in eval_indicators):
-            return BloomLevel.EVALUATE
-
-        analysis_indicators = ["compared to", "the difference", "because", "the reason", "relationship"]
-        if any(ind in response_lower for ind in analysis_indicators):
-            return BloomLevel.ANALYZE
-
-        apply_indicators = ["for example", "if we", "we can use", "this means"]
-        if any(ind in response_lower for ind in apply_indicators):
-            return BloomLevel.APPLY
+        # The highest level with any indicator present wins.
+        counts = DEPTH_MATCHER.counts(response_lower)
+        demonstrated = [level for level, count in counts.items() if count]
+        if demonstrated:
+            return max(demonstrated)
 
         if word_count > 15:
             return BloomLevel.UNDERSTAND
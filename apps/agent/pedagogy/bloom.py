@@ -2,6 +2,8 @@
 
 from enum import IntEnum
 
+import numpy as np
+
 
 class BloomLevel(IntEnum):
     REMEMBER = 1
@@ -52,6 +54,14 @@ BLOOM_QUESTION_STEMS = {
 }
 
 
+# Quiz difficulty as exposed to the LLM, mapped to the levels its questions target.
+DIFFICULTY_LEVELS = {
+    "easy": [BloomLevel.REMEMBER, BloomLevel.UNDERSTAND],
+    "medium": [BloomLevel.APPLY, BloomLevel.ANALYZE],
+    "hard": [BloomLevel.EVALUATE, BloomLevel.CREATE],
+}
+
+
 BLOOM_VERBS = {
     BloomLevel.REMEMBER: ["define", "list", "recall", "identify", "name", "state"],
     BloomLevel.UNDERSTAND: ["explain", "describe", "summarize", "interpret", "classify"],
@@ -71,6 +81,14 @@ def get_target_level(current_score: float, current_level: BloomLevel) -> BloomLe
     return current_level
 
 
+def get_target_levels(scores: np.ndarray, levels: np.ndarray) -> np.ndarray:
+    """get_target_level applied elementwise to arrays of scores and levels."""
+    levels = np.asarray(levels)
+    up = (scores >= 0.8) & (levels < BloomLevel.CREATE)
+    down = (scores < 0.4) & (levels > BloomLevel.REMEMBER)
+    return (levels + up - down).astype(levels.dtype)
+
+
 def get_question_stems(level: BloomLevel) -> list[str]:
     """Get question stems for a given Bloom's level."""
     return BLOOM_QUESTION_STEMS.get(level, BLOOM_QUESTION_STEMS[BloomLevel.UNDERSTAND])
@@ -3,38 +3,57 @@
 import json
 from typing import Optional
 
+from .bloom import BloomLevel, DIFFICULTY_LEVELS
+from .question_bank import QuestionBank
+
 
 class PedagogicalEngine:
     """Handles quiz generation, understanding evaluation, and adaptive teaching logic."""
 
+    def __init__(self, question_bank: Optional[QuestionBank] = None):
+        self.question_bank = question_bank or QuestionBank()
+
     async def generate_quiz(
         self,
         topic: str,
         difficulty: str = "medium",
         num_questions: int = 3,
         course_context: Optional[dict] = None,
+        student_id: Optional[str] = None,
     ) -> dict:
-        """Generate quiz questions for a topic."""
-        difficulty_map = {
-            "easy": ["REMEMBER", "UNDERSTAND"],
-            "medium": ["APPLY", "ANALYZE"],
-            "hard": ["EVALUATE", "CREATE"],
-        }
-        bloom_levels = difficulty_map.get(difficulty, ["APPLY"])
+        """Generate quiz questions for a topic.
 
-        return {
-            "topic": topic,
-            "difficulty": difficulty,
-            "bloom_levels": bloom_levels,
-            "questions": [
-                {
+        Questions come from the course's pre-generated bank where possible;
+        slots the bank cannot fill are generated on the spot, and the topic
+        is queued for background generation so the next quiz hits the bank.
+        """
+        levels = DIFFICULTY_LEVELS.get(difficulty, [BloomLevel.APPLY])
+        course_id = (course_context or {}).get("id")
+
+        questions = []
+        used: set[str] = set()
+        missed = False
+        for i in range(num_questions):
+            level = levels[i % len(levels)]
+            question = self.question_bank.draw(course_id, topic, level, student_id, exclude=used)
+            if question is None:
+                missed = True
+                question = {
                     "id": f"q{i+1}",
                     "text": f"Question {i+1} about {topic} ({difficulty})",
                     "type": "open_ended",
-                    "bloom_level": bloom_levels[i % len(bloom_levels)],
+                    "bloom_level": level.name,
                 }
-                for i in range(num_questions)
-            ],
+            used.add(question["id"])
+            questions.append(question)
+        if missed:
+            self.question_bank.schedule(course_id, [topic])
+
+        return {
+            "topic": topic,
+            "difficulty": difficulty,
+            "bloom_levels": [level.name for level in levels],
+            "questions": questions,
         }
 
     async def evaluate_understanding(
@@ -0,0 +1,202 @@
+"""Per-student mastery model over every objective of a course."""
+
+import os
+import struct
+from typing import Optional
+
+import numpy as np
+
+from .bloom import BloomLevel, get_target_levels
+
+# magic, format version, objective count, length of the newline-joined ids
+HEADER = struct.Struct("<4sHII")
+MAGIC = b"EDLM"
+VERSION = 1
+
+
+class LearnerModel:
+    """Bayesian Knowledge Tracing over a course's objectives, one array slot per objective.
+
+    ``mastery`` holds P(objective learned) and ``levels`` the Bloom level to
+    target next; both are updated for a whole batch of assessments at once,
+    and ``plan`` picks the next objective across all of them in one pass.
+    """
+
+    def __init__(
+        self,
+        objective_ids: list[str],
+        levels: Optional[list[int]] = None,
+        p_init: float = 0.2,
+        p_learn: float = 0.15,
+        p_slip: float = 0.1,
+        p_guess: float = 0.2,
+        mastery_threshold: float = 0.95,
+    ):
+        self.objective_ids = list(objective_ids)
+        self.index = {objective_id: i for i, objective_id in enumerate(self.objective_ids)}
+        n = len(self.objective_ids)
+        self.mastery = np.full(n, p_init, dtype=np.float32)
+        self.levels = (
+            np.asarray(levels, dtype=np.uint8) if levels is not None
+            else np.full(n, BloomLevel.UNDERSTAND, dtype=np.uint8)
+        )
+        self.attempts = np.zeros(n, dtype=np.uint16)
+        self.p_learn = p_learn
+        self.p_slip = p_slip
+        self.p_guess = p_guess
+        self.mastery_threshold = mastery_threshold
+
+    @classmethod
+    def from_course(cls, course: dict, **params) -> "LearnerModel":
+        """One slot per learning objective, starting at the objective's own Bloom level."""
+        ids: list[str] = []
+        levels: list[int] = []
+        for module in course.get("modules", []):
+            for objective in module.get("learningObjectives", []):
+                if objective.get("id"):
+                    ids.append(objective["id"])
+                    # A missing, null or unrecognised level is treated as UNDERSTAND.
+                    level = str(objective.get("bloomLevel")).upper()
+                    levels.append(BloomLevel.__members__.get(level, BloomLevel.UNDERSTAND))
+        return cls(ids, levels, **params)
+
+    def __len__(self) -> int:
+        return len(self.objective_ids)
+
+    def update(self, objective_id: str, score: float) -> bool:
+        """Record one assessment with score in [0, 1]; False if the objective is unknown."""
+        return self.update_many([objective_id], [score]) == 1
+
+    def update_many(self, objective_ids: list[str], scores: list[float]) -> int:
+        """Apply one BKT step per (objective, score); returns how many objectives were known.
+
+        A score is treated as the probability the answer was correct, so
+        partial credit moves mastery part of the way.
+        """
+        pairs = [(self.index[o], s) for o, s in zip(objective_ids, scores) if o in self.index]
+        if not pairs:
+            return 0
+        idx = np.fromiter((i for i, _ in pairs), dtype=np.intp, count=len(pairs))
+        observed = np.clip(np.fromiter((s for _, s in pairs), dtype=np.float32, count=len(pairs)), 0.0, 1.0)
+        if len(np.unique(idx)) != len(idx):
+            # Repeated objectives must be applied in order.
+            for i, score in zip(idx, observed):
+                self._step(np.array([i]), np.array([score], dtype=np.float32))
+        else:
+            self._step(idx, observed)
+        return len(pairs)
+
+    def _step(self, idx: np.ndarray, observed: np.ndarray):
+        p = self.mastery[idx]
+        slip, guess = self.p_slip, self.p_guess
+        if_correct = p * (1 - slip) / (p * (1 - slip) + (1 - p) * guess)
+        if_incorrect = p * slip / (p * slip + (1 - p) * (1 - guess))
+        posterior = observed * if_correct + (1 - observed) * if_incorrect
+        self.mastery[idx] = mastery = posterior + (1 - posterior) * self.p_learn
+        # Move up a level once mastered at this one, down when struggling.
+        self.levels[idx] = get_target_levels(mastery, self.levels[idx])
+        self.attempts[idx] = np.minimum(self.attempts[idx].astype(np.uint32) + 1, np.iinfo(np.uint16).max)
+
+    def plan(self) -> tuple[np.ndarray, int]:
+        """Target level for every objective, and the index of the next one to teach (-1 if all mastered).
+
+        The next objective is the first unmastered one in course order.
+        """
+        unmastered = self.mastery < self.mastery_threshold
+        return self.levels.copy(), int(np.argmax(unmastered)) if unmastered.any() else -1
+
+    def next_objective(self) -> Optional[tuple[str, BloomLevel]]:
+        targets, i = self.plan()
+        if i < 0:
+            return None
+        return self.objective_ids[i], BloomLevel(int(targets[i]))
+
+    def mastery_of(self, objective_id: str) -> Optional[float]:
+        i = self.index.get(objective_id)
+        return None if i is None else float(self.mastery[i])
+
+    def memory_bytes(self) -> int:
+        return self.mastery.nbytes + self.levels.nbytes + self.attempts.nbytes
+
+    def to_bytes(self) -> bytes:
+        """Header, newline-joined ids, then float16 mastery, uint8 levels and uint16 attempts."""
+        ids = "\n".join(self.objective_ids).encode()
+        return b"".join([
+            HEADER.pack(MAGIC, VERSION, len(self), len(ids)),
+            ids,
+            self.mastery.astype(np.float16).tobytes(),
+            self.levels.tobytes(),
+            self.attempts.tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes, **params) -> "LearnerModel":
+        magic, version, n, ids_length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a learner state (magic {magic!r}, version {version})")
+        offset = HEADER.size
+        ids = data[offset:offset + ids_length].decode().split("\n") if n else []
+        offset += ids_length
+        model = cls(ids, **params)
+        model.mastery = np.frombuffer(data, dtype=np.float16, count=n, offset=offset).astype(np.float32)
+        offset += 2 * n
+        model.levels = np.frombuffer(data, dtype=np.uint8, count=n, offset=offset).copy()
+        offset += n
+        model.attempts = np.frombuffer(data, dtype=np.uint16, count=n, offset=offset).copy()
+        return model
+
+    def aligned_to(self, other: "LearnerModel") -> "LearnerModel":
+        """``other`` (the course's current objectives) carrying this model's state for objectives both share."""
+        shared = [(i, self.index[o]) for i, o in enumerate(other.objective_ids) if o in self.index]
+        if shared:
+            dst, src = (np.array(x, dtype=np.intp) for x in zip(*shared))
+            other.mastery[dst] = self.mastery[src]
+            other.levels[dst] = self.levels[src]
+            other.attempts[dst] = self.attempts[src]
+        return other
+
+
+def path_component(key: str) -> str:
+    """An id as a single file or directory name: no separators, never "." or ".."."""
+    key = key.replace(os.sep, "_")
+    if os.altsep:
+        key = key.replace(os.altsep, "_")
+    return key if key.strip(".") else key.replace(".", "_")
+
+
+class LearnerStore:
+    """Learner states on disk, one small binary file per (course, student)."""
+
+    def __init__(self, state_dir: Optional[str] = None):
+        self.state_dir = state_dir or os.getenv("LEARNER_STATE_DIR", "./data/learners")
+
+    def _path(self, course_id: str, student_id: str) -> str:
+        return os.path.join(self.state_dir, path_component(course_id), f"{path_component(student_id)}.bkt")
+
+    def load(self, student_id: Optional[str], course: dict) -> LearnerModel:
+        """The student's saved state mapped onto the course's current objectives."""
+        model = LearnerModel.from_course(course)
+        if not student_id or not course.get("id"):
+            return model
+        try:
+            with open(self._path(course["id"], student_id), "rb") as f:
+                return LearnerModel.from_bytes(f.read()).aligned_to(model)
+        except FileNotFoundError:
+            return model
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Learner state load error for {student_id}: {e}")
+            return model
+
+    def save(self, student_id: Optional[str], course_id: Optional[str], model: LearnerModel) -> bool:
+        if not student_id or not course_id or not len(model):
+            return False
+        path = self._path(course_id, student_id)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(model.to_bytes())
+            os.replace(path + ".tmp", path)
+            return True
+        except OSError as e:
+            print(f"Learner state save error for {student_id}: {e}")
+            return False
@@ -1,34 +1,14 @@
-"""System prompt templates for the educational avatar."""
+"""System prompt templates for the educational avatar.
 
+The prompt is laid out for provider-side prefix caching: a byte-stable
+prefix shared by every session, then the teaching style, persona and course
+(memoized per combination), then the few per-student lines.
+"""
 
-def build_system_prompt(
-    persona: dict,
-    student: dict,
-    course: dict,
-    teaching_style: str = "ADAPTIVE",
-) -> str:
-    """Build a comprehensive system prompt for the educational avatar."""
-
-    persona_name = persona.get("name", "Tutor")
-    personality = persona.get("personalityPrompt", "You are a friendly and patient tutor.")
-    student_name = student.get("name", "Student")
-    course_title = course.get("title", "General")
-    subject = course.get("subject", "General Knowledge")
-
-    style_instructions = TEACHING_STYLE_PROMPTS.get(teaching_style, TEACHING_STYLE_PROMPTS["ADAPTIVE"])
-
-    return f"""You are {persona_name}, an AI educational tutor avatar.
+from functools import lru_cache
 
-## YOUR PERSONALITY
-{personality}
 
-## STUDENT CONTEXT
-- Student name: {student_name}
-- Course: {course_title}
-- Subject: {subject}
-
-## TEACHING METHODOLOGY
-{style_instructions}
+STATIC_PROMPT_PREFIX = """You are an AI educational tutor avatar. Your persona, teaching style, course and student are described after these general instructions.
 
 ## CORE PRINCIPLES
 1. **Patience**: Never show frustration. If a student struggles, simplify and try a different approach.
@@ -66,6 +46,50 @@ Adjust the level based on student responses. If they struggle, go back a level.
 """
 
 
+def build_system_prompt(
+    persona: dict,
+    student: dict,
+    course: dict,
+    teaching_style: str = "ADAPTIVE",
+) -> str:
+    """Build a comprehensive system prompt for the educational avatar."""
+    session_section = _render_session_section(
+        persona.get("name", "Tutor"),
+        persona.get("personalityPrompt", "You are a friendly and patient tutor."),
+        course.get("title", "General"),
+        course.get("subject", "General Knowledge"),
+        teaching_style,
+    )
+    return STATIC_PROMPT_PREFIX + session_section + f"""
+## STUDENT CONTEXT
+- Student name: {student.get("name", "Student")}
+"""
+
+
+@lru_cache(maxsize=256)
+def _render_session_section(
+    persona_name: str,
+    personality: str,
+    course_title: str,
+    subject: str,
+    teaching_style: str,
+) -> str:
+    """Render the part of the prompt fixed by (persona, course, teaching_style)."""
+    style_instructions = TEACHING_STYLE_PROMPTS.get(teaching_style, TEACHING_STYLE_PROMPTS["ADAPTIVE"])
+    return f"""
+## TEACHING METHODOLOGY
+{style_instructions}
+
+## YOUR PERSONALITY
+You are {persona_name}.
+{personality}
+
+## COURSE CONTEXT
+- Course: {course_title}
+- Subject: {subject}
+"""
+
+
 TEACHING_STYLE_PROMPTS = {
     "SOCRATIC": "Use the Socratic method. Instead of giving answers directly, guide the student through a series of questions that help them discover the answer themselves. Ask probing questions like 'What do you think would happen if...?' or 'Why do you think that is?' Only give direct answers when the student is truly stuck after multiple attempts.",
 
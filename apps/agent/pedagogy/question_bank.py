@@ -0,0 +1,215 @@
+"""Pre-generated quiz questions per course, topic and Bloom level."""
+
+import argparse
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import random
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Union
+
+from tools.quiz import QuizGenerator
+from utils.pools import shared_loop
+from .bloom import BloomLevel
+from .learner import path_component
+
+# (topic, level, count) -> question dicts with at least "question"
+Generator = Callable[[str, BloomLevel, int], Union[list[dict], Awaitable[list[dict]]]]
+
+
+def normalize_topic(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+def course_topics(course: dict) -> list[str]:
+    """Module titles and learning objective descriptions from a course config."""
+    topics: list[str] = []
+    for module in course.get("modules", []):
+        if module.get("title"):
+            topics.append(module["title"])
+        for objective in module.get("learningObjectives", []):
+            if objective.get("description"):
+                topics.append(objective["description"])
+    return topics
+
+
+class QuestionBank:
+    """Question banks keyed by (course, topic, Bloom level), stored one JSON file per course.
+
+    ``schedule`` fills banks in a background task ahead of use; ``draw``
+    is a dict lookup that never generates. A student is not served the
+    same banked question twice until they have seen the whole bank.
+    """
+
+    def __init__(
+        self,
+        bank_dir: Optional[str] = None,
+        generator: Optional[Generator] = None,
+        questions_per_level: int = 4,
+        max_students: int = 10000,
+    ):
+        self.bank_dir = bank_dir or os.getenv("QUESTION_BANK_DIR", "./data/question_banks")
+        self.generator = generator or QuizGenerator().generate_questions
+        self.questions_per_level = questions_per_level
+        self.max_students = max_students
+        self._banks: dict[str, dict[tuple[str, BloomLevel], list[dict]]] = {}
+        # (student, course, topic, level) -> ids already served, least recently used first
+        self._served: OrderedDict[tuple, set[str]] = OrderedDict()
+        self._filling: set[tuple[str, str]] = set()
+        self._tasks: set = set()
+        # Sessions on different job threads draw and schedule concurrently.
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, course_id: str) -> str:
+        return os.path.join(self.bank_dir, f"{path_component(course_id)}.json")
+
+    def _course(self, course_id: str) -> dict[tuple[str, BloomLevel], list[dict]]:
+        bank = self._banks.get(course_id)
+        if bank is not None:
+            return bank
+        bank = {}
+        try:
+            with open(self._path(course_id)) as f:
+                for entry in json.load(f):
+                    bank[(entry["topic"], BloomLevel[entry["bloom_level"]])] = entry["questions"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Question bank load error for {course_id}: {e}")
+        # Another thread may have loaded it meanwhile; keep the first copy.
+        return self._banks.setdefault(course_id, bank)
+
+    def _save(self, course_id: str):
+        os.makedirs(self.bank_dir, exist_ok=True)
+        entries = [
+            {"topic": topic, "bloom_level": level.name, "questions": questions}
+            for (topic, level), questions in self._course(course_id).items()
+        ]
+        tmp_path = self._path(course_id) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self._path(course_id))
+
+    def draw(
+        self,
+        course_id: Optional[str],
+        topic: str,
+        bloom_level: BloomLevel,
+        student_id: Optional[str] = None,
+        exclude: Optional[set[str]] = None,
+    ) -> Optional[dict]:
+        """A banked question the student has not been served yet, or None on a miss."""
+        key = (normalize_topic(topic), bloom_level)
+        questions = self._course(course_id or "default").get(key, [])
+        served_key = (student_id, course_id, *key)
+        exclude = exclude or set()
+        with self._lock:
+            served = self._served.get(served_key, set()) if student_id else set()
+            candidates = [q for q in questions if q["id"] not in served and q["id"] not in exclude]
+            if not candidates and served:
+                # The student has seen the whole bank; start another pass.
+                served = set()
+                candidates = [q for q in questions if q["id"] not in exclude]
+            if not candidates:
+                self.misses += 1
+                return None
+
+            question = random.choice(candidates)
+            if student_id:
+                self._served[served_key] = served | {question["id"]}
+                self._served.move_to_end(served_key)
+                while len(self._served) > self.max_students:
+                    self._served.popitem(last=False)
+            self.hits += 1
+        return question
+
+    def schedule(self, course_id: Optional[str], topics: list[str], levels: Optional[list[BloomLevel]] = None):
+        """Fill the banks for these topics in the background; topics already being filled are skipped."""
+        course_id = course_id or "default"
+        with self._lock:
+            topics = [t for t in dict.fromkeys(normalize_topic(t) for t in topics) if (course_id, t) not in self._filling]
+            if not topics:
+                return
+            self._filling.update((course_id, t) for t in topics)
+        # On the shared loop when hosting many sessions, so a fill outlives the session that asked.
+        task = shared_loop.spawn(self.fill(course_id, topics, levels))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def fill(self, course_id: str, topics: list[str], levels: Optional[list[BloomLevel]] = None) -> int:
+        """Generate questions for every (topic, level) bank below ``questions_per_level``; returns how many."""
+        added = 0
+        bank = self._course(course_id)
+        try:
+            for topic in topics:
+                topic = normalize_topic(topic)
+                for level in levels or list(BloomLevel):
+                    questions = bank.setdefault((topic, level), [])
+                    missing = self.questions_per_level - len(questions)
+                    if missing <= 0:
+                        continue
+                    try:
+                        generated = self.generator(topic, level, missing)
+                        if inspect.isawaitable(generated):
+                            generated = await generated
+                    except Exception as e:
+                        print(f"Question generation error for {topic!r} {level.name}: {e}")
+                        continue
+                    known = {q["id"] for q in questions}
+                    for question in generated:
+                        question = self.to_bank_question(course_id, topic, level, question)
+                        if question["id"] not in known:
+                            known.add(question["id"])
+                            questions.append(question)
+                            added += 1
+                    # Let the conversation's own tasks run between generations.
+                    await asyncio.sleep(0)
+            if added:
+                self._save(course_id)
+        finally:
+            with self._lock:
+                self._filling.difference_update((course_id, normalize_topic(t)) for t in topics)
+        return added
+
+    @staticmethod
+    def to_bank_question(course_id: str, topic: str, level: BloomLevel, question: dict) -> dict:
+        text = question.get("text") or question["question"]
+        digest = hashlib.sha1(f"{course_id}\0{topic}\0{level.name}\0{text}".encode()).hexdigest()[:12]
+        return {
+            "id": f"qb-{digest}",
+            "text": text,
+            "type": question.get("type", "open_ended"),
+            "bloom_level": level.name,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "courses": len(self._banks),
+            "questions": sum(len(q) for bank in self._banks.values() for q in bank.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "filling": len(self._filling),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate question banks for a course.")
+    parser.add_argument("course", help="course config JSON (id, modules[].title, modules[].learningObjectives[])")
+    parser.add_argument("--topic", action="append", default=[], help="extra topic; may be repeated")
+    parser.add_argument("--per-level", type=int, default=4)
+    args = parser.parse_args()
+
+    with open(args.course) as f:
+        course = json.load(f)
+    bank = QuestionBank(questions_per_level=args.per_level)
+    added = asyncio.run(bank.fill(course["id"], course_topics(course) + args.topic))
+    print(f"Added {added} questions; {bank.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Content-addressed embedding cache backed by SQLite with an in-memory LRU."""
+
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """Caches embeddings keyed by hash(model, text).
+
+    Vectors are stored as raw float32 blobs in SQLite so every process on the
+    host shares them; the most recently used ones are also kept in memory.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_size: int = 4096):
+        self.path = path or os.getenv("EMBEDDING_CACHE_PATH", "./data/embeddings.sqlite")
+        self.memory_size = memory_size
+        self._memory: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+        return self._db
+
+    @staticmethod
+    def key(model: str, text: str) -> bytes:
+        return hashlib.blake2b(f"{model}\0{text}".encode(), digest_size=16).digest()
+
+    def get_many(self, model: str, texts: list[str]) -> list[Optional[np.ndarray]]:
+        """Look up embeddings for texts, returning None for each miss."""
+        keys = [self.key(model, t) for t in texts]
+        results: list[Optional[np.ndarray]] = [None] * len(texts)
+        pending: dict[bytes, list[int]] = {}
+
+        for i, key in enumerate(keys):
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                results[i] = vector
+            else:
+                pending.setdefault(key, []).append(i)
+
+        if pending:
+            try:
+                found = self._select(list(pending))
+            except sqlite3.Error as e:
+                print(f"Embedding cache read error: {e}")
+                found = {}
+            for key, positions in pending.items():
+                blob = found.get(key)
+                if blob is None:
+                    self.misses += len(positions)
+                    continue
+                vector = np.frombuffer(blob, dtype=np.float32)
+                self._remember(key, vector)
+                self.disk_hits += len(positions)
+                for i in positions:
+                    results[i] = vector
+        return results
+
+    def put_many(self, model: str, texts: list[str], vectors: list) -> None:
+        """Store embeddings for texts; None vectors are skipped."""
+        rows = []
+        for text, vector in zip(texts, vectors):
+            if vector is None:
+                continue
+            array = np.asarray(vector, dtype=np.float32)
+            key = self.key(model, text)
+            self._remember(key, array)
+            rows.append((key, array.tobytes()))
+        if not rows:
+            return
+        try:
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+                )
+        except sqlite3.Error as e:
+            print(f"Embedding cache write error: {e}")
+
+    def _select(self, keys: list[bytes]) -> dict[bytes, bytes]:
+        found: dict[bytes, bytes] = {}
+        # Stay under SQLite's default bound-parameter limit.
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            )
+            found.update(rows)
+        return found
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,139 @@
+"""Token-budgeted assembly of retrieved curriculum chunks for the LLM context."""
+
+import os
+from typing import Optional
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English)."""
+    return (len(text) + 3) // 4
+
+
+def _word_overlap(a: list[str], b: list[str], max_overlap: int) -> int:
+    """Length of the longest suffix of a that is also a prefix of b."""
+    for k in range(min(len(a), len(b), max_overlap), 0, -1):
+        if a[-k] == b[0] and a[-k:] == b[:k]:
+            return k
+    return 0
+
+
+def _jaccard(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class ContextAssembler:
+    """Turns retrieved chunks into the smallest useful context for a turn.
+
+    Chunks from the same source whose edges overlap (as produced by
+    ``chunk_text``) are stitched together, with the absorbed chunks' ids kept
+    in ``merged_ids``, and duplicates are dropped. The rest are ordered by
+    maximal marginal relevance (relevance vs. word overlap with chunks
+    already chosen) and added until ``token_budget`` is reached, with the
+    last one truncated to fill the remaining space (and marked ``truncated``).
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        diversity: float = 0.3,
+        max_overlap_words: int = 100,
+        min_fragment_tokens: int = 40,
+    ):
+        self.token_budget = token_budget or int(os.getenv("CONTEXT_TOKEN_BUDGET", "800"))
+        self.diversity = diversity
+        self.max_overlap_words = max_overlap_words
+        self.min_fragment_tokens = min_fragment_tokens
+
+    def assemble(self, chunks: list[dict], token_budget: Optional[int] = None) -> tuple[list[dict], dict]:
+        """Return the chunks to inject and stats on the tokens they save."""
+        budget = token_budget or self.token_budget
+        tokens_in = sum(estimate_tokens(c.get("content", "")) for c in chunks)
+
+        merged = self._merge(chunks)
+        selected = self._select(merged)
+
+        out: list[dict] = []
+        used = 0
+        for chunk in selected:
+            cost = estimate_tokens(chunk["content"])
+            if used + cost <= budget:
+                out.append(chunk)
+                used += cost
+                continue
+            remaining = budget - used
+            if remaining >= self.min_fragment_tokens:
+                out.append({**chunk, "content": self._truncate(chunk["content"], remaining), "truncated": True})
+                used += estimate_tokens(out[-1]["content"])
+            break
+
+        stats = {
+            "chunks_in": len(chunks),
+            "chunks_out": len(out),
+            "tokens_in": tokens_in,
+            "tokens_out": used,
+            "tokens_saved": tokens_in - used,
+        }
+        return out, stats
+
+    def _merge(self, chunks: list[dict]) -> list[dict]:
+        """Stitch overlapping chunks from the same source and drop duplicates."""
+        items: list[dict] = []
+        seen: set[str] = set()
+        for rank, chunk in enumerate(chunks):
+            content = chunk.get("content", "")
+            if not content or content in seen:
+                continue
+            seen.add(content)
+            relevance = chunk.get("score", 1.0 - rank / max(len(chunks), 1))
+            items.append({**chunk, "_words": content.split(), "_relevance": relevance})
+
+        merged = True
+        while merged:
+            merged = False
+            for i, a in enumerate(items):
+                for j, b in enumerate(items):
+                    if i == j or a.get("source_file") != b.get("source_file"):
+                        continue
+                    k = _word_overlap(a["_words"], b["_words"], self.max_overlap_words)
+                    if k:
+                        words = a["_words"] + b["_words"][k:]
+                        absorbed = [b["id"]] if b.get("id") else []
+                        a["merged_ids"] = a.get("merged_ids", []) + absorbed + b.get("merged_ids", [])
+                        a.update(
+                            content=" ".join(words),
+                            _words=words,
+                            _relevance=max(a["_relevance"], b["_relevance"]),
+                        )
+                        del items[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return items
+
+    def _select(self, items: list[dict]) -> list[dict]:
+        """Order chunks by maximal marginal relevance."""
+        word_sets = [set(item["_words"]) for item in items]
+        remaining = list(range(len(items)))
+        chosen: list[int] = []
+        while remaining:
+            def mmr(i: int) -> float:
+                redundancy = max((_jaccard(word_sets[i], word_sets[j]) for j in chosen), default=0.0)
+                return (1 - self.diversity) * items[i]["_relevance"] - self.diversity * redundancy
+            best = max(remaining, key=mmr)
+            remaining.remove(best)
+            chosen.append(best)
+        return [
+            {k: v for k, v in items[i].items() if not k.startswith("_")}
+            for i in chosen
+        ]
+
+    @staticmethod
+    def _truncate(content: str, tokens: int) -> str:
+        limit = tokens * 4 - 3
+        if len(content) <= limit:
+            return content
+        cut = content.rfind(" ", 0, limit)
+        return content[: cut if cut > 0 else limit] + "..."
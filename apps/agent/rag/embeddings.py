@@ -1,40 +1,172 @@
 """Embedding generation for curriculum content."""
 
+import asyncio
 import os
+import random
 from typing import Optional
 import httpx
 
+from utils.pools import shared
+from .cache import EmbeddingCache
+from .local_embeddings import HashingEmbedder
+
 
 class EmbeddingGenerator:
-    """Generates embeddings for text content."""
+    """Generates embeddings for text content.
+
+    Requests go through one long-lived pooled client. ``generate_batch`` packs
+    up to ``max_batch_size`` inputs into each request and keeps at most
+    ``max_concurrency`` requests in flight, backing off on HTTP 429. Results
+    are looked up in and written to an ``EmbeddingCache`` unless
+    ``EMBEDDING_CACHE=off``, so unchanged text is never embedded twice.
+    In multi-session mode the client and cache are used from the shared
+    loop only.
+
+    ``EMBEDDING_BACKEND=local`` replaces the API with a ``HashingEmbedder``
+    of ``EMBEDDING_DIM`` dimensions: no key, no network, no cache. Index
+    and query with the same backend, since the two vector spaces differ.
+    """
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_batch_size: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: int = 5,
+        cache: Optional[EmbeddingCache] = None,
+        backend: Optional[str] = None,
+    ):
+        self.backend = (backend or os.getenv("EMBEDDING_BACKEND", "openai")).lower()
+        self.local = (
+            HashingEmbedder(int(os.getenv("EMBEDDING_DIM", "384"))) if self.backend == "local" else None
+        )
         self.api_key = os.getenv("OPENAI_API_KEY")
-        self.model = "text-embedding-3-small"
+        self.model = self.local.model if self.local is not None else "text-embedding-3-small"
+        self.base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+        self.max_batch_size = max_batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "256"))
+        self.max_concurrency = max_concurrency or int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+        self.max_retries = max_retries
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # Local embeddings are cheaper to recompute than to look up.
+        if cache is None and self.local is None and os.getenv("EMBEDDING_CACHE", "on") != "off":
+            cache = EmbeddingCache()
+        self.cache = cache
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Lazily created client shared by every request from this generator."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._client
+
+    @shared
+    async def aclose(self):
+        """Close the pooled client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def generate(self, text: str) -> Optional[list[float]]:
         """Generate an embedding vector for the given text."""
+        if self.local is not None:
+            return self.local.embed([text])[0].tolist()
+        return await self._generate(text)
+
+    @shared
+    async def _generate(self, text: str) -> Optional[list[float]]:
+        if self.cache is not None:
+            cached = self.cache.get_many(self.model, [text])[0]
+            if cached is not None:
+                return cached.tolist()
+
         if not self.api_key:
             return None
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://api.openai.com/v1/embeddings",
-                    headers={"Authorization": f"Bearer {self.api_key}"},
-                    json={"input": text, "model": self.model},
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data["data"][0]["embedding"]
+            embedding = (await self._embed([text]))[0]
         except Exception as e:
             print(f"Embedding generation error: {e}")
             return None
 
+        if self.cache is not None:
+            self.cache.put_many(self.model, [text], [embedding])
+        return embedding
+
     async def generate_batch(self, texts: list[str]) -> list[Optional[list[float]]]:
         """Generate embeddings for multiple texts."""
-        results = []
-        for text in texts:
-            embedding = await self.generate(text)
-            results.append(embedding)
+        if self.local is not None:
+            return self.local.embed(texts).tolist()
+        return await self._generate_batch(texts)
+
+    @shared
+    async def _generate_batch(self, texts: list[str]) -> list[Optional[list[float]]]:
+        if self.cache is None:
+            return await self._generate_remote(texts)
+
+        cached = self.cache.get_many(self.model, texts)
+        results = [v.tolist() if v is not None else None for v in cached]
+        missing = [i for i, v in enumerate(results) if v is None]
+        if not missing:
+            return results
+
+        # Embed each distinct missing text once.
+        unique = list(dict.fromkeys(texts[i] for i in missing))
+        fresh = dict(zip(unique, await self._generate_remote(unique)))
+        self.cache.put_many(self.model, unique, [fresh[t] for t in unique])
+        for i in missing:
+            results[i] = fresh[texts[i]]
         return results
+
+    async def _generate_remote(self, texts: list[str]) -> list[Optional[list[float]]]:
+        """Embed texts through the API in concurrent, size-capped batches."""
+        if not self.api_key or not texts:
+            return [None] * len(texts)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(batch: list[str]) -> list[Optional[list[float]]]:
+            async with self._semaphore:
+                try:
+                    return await self._embed(batch)
+                except Exception as e:
+                    print(f"Embedding generation error: {e}")
+                    return [None] * len(batch)
+
+        size = self.max_batch_size
+        batches = [texts[i : i + size] for i in range(0, len(texts), size)]
+        results = await asyncio.gather(*(run(b) for b in batches))
+        return [embedding for batch in results for embedding in batch]
+
+    async def _embed(self, texts: list[str]) -> list[list[float]]:
+        """POST one embeddings request, retrying with backoff when rate limited."""
+        for attempt in range(self.max_retries + 1):
+            response = await self.client.post(
+                "/embeddings",
+                json={"input": texts, "model": self.model},
+            )
+            if response.status_code == 429 and attempt < self.max_retries:
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+            response.raise_for_status()
+            data = response.json()["data"]
+            return [item["embedding"] for item in sorted(data, key=lambda d: d["index"])]
+        raise RuntimeError("embedding request retries exhausted")
+
+    @staticmethod
+    def _backoff(attempt: int, response: httpx.Response) -> float:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return min(8.0, 0.25 * 2 ** attempt) * (0.5 + random.random() / 2)
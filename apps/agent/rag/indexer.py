@@ -1,14 +1,90 @@
-"""Document indexing pipeline for curriculum content."""
+"""Document indexing pipeline for curriculum content.
 
+Run from apps/agent to (re)index files into the local index:
+
+    python -m rag.indexer --course-id COURSE --module-id MODULE textbook.txt ...
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
 import os
-from typing import Optional
+import time
+from collections import deque
+from typing import Iterable, Iterator, Optional
+
+from .embeddings import EmbeddingGenerator
+from .lexical_index import LEXICAL_FILE, LexicalIndex
+from .local_index import LocalVectorIndex
+
+
+def iter_words(path: str, block_size: int = 1 << 16) -> Iterator[str]:
+    """Yield whitespace-separated words from a file without reading it whole."""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        tail = ""
+        while block := f.read(block_size):
+            words = (tail + block).split()
+            # A word cut at the block boundary continues in the next block.
+            tail = "" if block[-1].isspace() or not words else words.pop()
+            yield from words
+        if tail:
+            yield tail
+
+
+def iter_chunks(words: Iterable[str], chunk_size: int = 500, overlap: int = 50) -> Iterator[str]:
+    """Lazily split a word stream into overlapping chunks."""
+    if not 0 <= overlap < chunk_size:
+        raise ValueError(f"overlap must be in [0, chunk_size), got overlap={overlap} chunk_size={chunk_size}")
+    return _iter_chunks(words, chunk_size, chunk_size - overlap)
+
+
+def _iter_chunks(words: Iterable[str], chunk_size: int, step: int) -> Iterator[str]:
+    window: deque[str] = deque()
+    for word in words:
+        window.append(word)
+        if len(window) == chunk_size:
+            yield " ".join(window)
+            for _ in range(step):
+                window.popleft()
+    while window:
+        yield " ".join(window)
+        for _ in range(min(step, len(window))):
+            window.popleft()
+
+
+class IndexManifest:
+    """Chunk ids already committed to the index for one course module.
+
+    Saved after every committed batch, so an interrupted run resumes where it
+    stopped and a re-run only touches chunks that were added or removed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.chunks: dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.chunks = json.load(f).get("chunks", {})
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"chunks": self.chunks}, f)
+        os.replace(tmp, self.path)
 
 
 class DocumentIndexer:
     """Indexes curriculum documents into the vector database."""
 
-    def __init__(self):
+    def __init__(self, backend: Optional[str] = None, batch_size: int = 128):
+        self.backend = (backend or os.getenv("RAG_BACKEND", "pinecone")).lower()
         self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
+        self.embeddings = EmbeddingGenerator()
+        self.local_index = LocalVectorIndex() if self.backend == "local" else None
+        self.lexical_index = LexicalIndex(self.local_index) if self.local_index is not None else None
+        self.batch_size = batch_size
 
     async def index_document(
         self,
@@ -18,22 +94,186 @@ class DocumentIndexer:
         module_id: str,
     ) -> bool:
         """Index a document chunk into the vector database."""
+        if not self._can_store():
+            return False
+
+        embedding = await self.embeddings.generate(content)
+        if embedding is None:
+            return False
+        return self._upsert(course_id, [self._chunk(content, metadata, module_id)], [embedding])
+
+    async def index_file(
+        self,
+        path: str,
+        course_id: str,
+        module_id: str,
+        metadata: Optional[dict] = None,
+        chunk_size: int = 500,
+        overlap: int = 50,
+    ) -> dict:
+        """Stream a file through chunking, batched embedding and bulk upsert.
+
+        Chunks already recorded in the module manifest are skipped, and chunks
+        from this file that no longer appear are deleted once the whole file
+        has been read. With the local backend the course's BM25 index is then
+        rebuilt if anything changed.
+        """
+        stats = {"chunks": 0, "added": 0, "unchanged": 0, "deleted": 0, "failed": 0}
+        if not self._can_store():
+            return stats
+
+        metadata = {"source_file": path, **(metadata or {})}
+        manifest = self.load_manifest(course_id, module_id)
+        seen: set[str] = set()
+        batch: list[dict] = []
+
+        for content in iter_chunks(iter_words(path), chunk_size, overlap):
+            stats["chunks"] += 1
+            chunk = self._chunk(content, metadata, module_id)
+            if chunk["id"] in seen:
+                continue
+            seen.add(chunk["id"])
+            if chunk["id"] in manifest.chunks:
+                stats["unchanged"] += 1
+                continue
+            batch.append(chunk)
+            if len(batch) >= self.batch_size:
+                await self._commit(course_id, batch, manifest, stats)
+                batch = []
+        if batch:
+            await self._commit(course_id, batch, manifest, stats)
+
+        stale = {
+            chunk_id for chunk_id, entry in manifest.chunks.items()
+            if entry.get("source_file") == metadata["source_file"] and chunk_id not in seen
+        }
+        if stale and self._delete(course_id, stale):
+            for chunk_id in stale:
+                del manifest.chunks[chunk_id]
+            manifest.save()
+            stats["deleted"] = len(stale)
+
+        if self.lexical_index is not None:
+            lexical_path = os.path.join(self.local_index.index_dir, course_id, LEXICAL_FILE)
+            if stats["added"] or stats["deleted"] or not os.path.exists(lexical_path):
+                self.lexical_index.build(course_id)
+        return stats
+
+    async def _commit(self, course_id: str, batch: list[dict], manifest: IndexManifest, stats: dict):
+        """Embed and upsert one batch, then record it in the manifest."""
+        embeddings = await self.embeddings.generate_batch([c["content"] for c in batch])
+        ready = [(c, e) for c, e in zip(batch, embeddings) if e is not None]
+        stats["failed"] += len(batch) - len(ready)
+        if not ready:
+            return
+
+        chunks = [c for c, _ in ready]
+        if not self._upsert(course_id, chunks, [e for _, e in ready]):
+            stats["failed"] += len(chunks)
+            return
+        for chunk in chunks:
+            manifest.chunks[chunk["id"]] = {"source_file": chunk["source_file"]}
+        manifest.save()
+        stats["added"] += len(chunks)
+
+    def _can_store(self) -> bool:
+        """Whether chunks can be written; only the local backend stores them so far."""
+        if self.local_index is not None:
+            return True
         if not self.pinecone_api_key:
             print("Pinecone not configured. Skipping indexing.")
+        else:
+            print("Pinecone indexing is not implemented; use RAG_BACKEND=local. Skipping indexing.")
+        return False
+
+    def _upsert(self, course_id: str, chunks: list[dict], embeddings: list[list[float]]) -> bool:
+        if self.local_index is None:
+            return False
+        try:
+            self.local_index.upsert(course_id, chunks, embeddings)
+            return True
+        except Exception as e:
+            print(f"Indexing error: {e}")
             return False
 
+    def _delete(self, course_id: str, chunk_ids: set[str]) -> bool:
+        if self.local_index is None:
+            return False
         try:
-            # TODO: Implement when Pinecone is configured
+            self.local_index.delete(course_id, chunk_ids)
             return True
         except Exception as e:
             print(f"Indexing error: {e}")
             return False
 
+    def load_manifest(self, course_id: str, module_id: str) -> IndexManifest:
+        if self.local_index is not None:
+            index_dir = self.local_index.index_dir
+        else:
+            index_dir = os.getenv("RAG_INDEX_DIR", "./data/index")
+        return IndexManifest(os.path.join(index_dir, course_id, "manifests", f"{module_id}.json"))
+
+    def _chunk(self, content: str, metadata: dict, module_id: str) -> dict:
+        return {
+            "id": metadata.get("id") or self.chunk_id(module_id, content),
+            "content": content,
+            "type": metadata.get("type", "text"),
+            "source_file": metadata.get("source_file", ""),
+            "module_id": module_id,
+        }
+
+    @staticmethod
+    def chunk_id(module_id: str, content: str) -> str:
+        """Stable id for a chunk derived from its module and content."""
+        return hashlib.sha1(f"{module_id}\0{content}".encode()).hexdigest()
+
     def chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 50) -> list[str]:
         """Split text into overlapping chunks."""
-        words = text.split()
-        chunks = []
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = " ".join(words[i : i + chunk_size])
-            chunks.append(chunk)
-        return chunks
+        return list(iter_chunks(text.split(), chunk_size, overlap))
+
+
+async def _main(args: argparse.Namespace):
+    indexer = DocumentIndexer(backend=args.backend, batch_size=args.batch_size)
+    total_chunks = total_bytes = 0
+    start = time.perf_counter()
+    try:
+        for path in args.files:
+            file_start = time.perf_counter()
+            stats = await indexer.index_file(
+                path,
+                course_id=args.course_id,
+                module_id=args.module_id,
+                metadata={"type": args.type},
+                chunk_size=args.chunk_size,
+                overlap=args.overlap,
+            )
+            elapsed = time.perf_counter() - file_start
+            total_chunks += stats["chunks"]
+            total_bytes += os.path.getsize(path)
+            print(f"{path}: {stats} in {elapsed:.2f}s")
+    finally:
+        await indexer.embeddings.aclose()
+
+    elapsed = time.perf_counter() - start
+    print(f"{total_chunks} chunks, {total_bytes / 1e6:.1f} MB in {elapsed:.2f}s "
+          f"({total_chunks / elapsed:.1f} chunks/sec, {total_bytes / 1e6 / elapsed:.2f} MB/sec)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index curriculum files into the vector store.")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--course-id", required=True)
+    parser.add_argument("--module-id", required=True)
+    parser.add_argument("--type", default="text", help="content type stored on each chunk")
+    parser.add_argument("--backend", default=None, help="local or pinecone (default: RAG_BACKEND)")
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    args = parser.parse_args()
+    if not 0 <= args.overlap < args.chunk_size:
+        parser.error("--overlap must be at least 0 and smaller than --chunk-size")
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""BM25 inverted index over the chunks of each local course shard."""
+
+import os
+import re
+import unicodedata
+from typing import Iterator, Optional
+
+import numpy as np
+
+from .local_index import CHUNKS_FILE, LocalVectorIndex, top_indices
+
+LEXICAL_FILE = "lexical.npz"
+
+# Keeps formula names, chapter ids and codes ("co2", "3.2", "chapter-4") whole.
+# [^\W_] is a letter or digit in any script.
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:[._\-'][^\W_]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from how i in is it its of on or so "
+    "that the their then there these this to was what when where which who why will with you".split()
+)
+
+
+def tokenize(text: str) -> Iterator[str]:
+    """Lowercased NFKC terms without stopwords; compound terms also yield their parts."""
+    for token in TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).lower()):
+        if token in STOPWORDS:
+            continue
+        yield token
+        if not token.isalnum():
+            for part in re.split(r"[._\-']", token):
+                if part and part not in STOPWORDS:
+                    yield part
+
+
+class LexicalShard:
+    """One course's postings in flat arrays.
+
+    The postings of ``terms[i]`` are ``docs[offsets[i]:offsets[i + 1]]`` (row
+    positions in the course's ``chunks.json``) with matching precomputed
+    BM25 weights, so a query is a few array slices and a scatter-add.
+    """
+
+    __slots__ = ("source_mtime", "num_docs", "term_ids", "offsets", "docs", "weights")
+
+    def __init__(
+        self,
+        source_mtime: float,
+        num_docs: int,
+        terms,
+        offsets: np.ndarray,
+        docs: np.ndarray,
+        weights: np.ndarray,
+    ):
+        self.source_mtime = source_mtime
+        self.num_docs = num_docs
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.docs = docs
+        self.weights = weights
+
+    @classmethod
+    def build(cls, chunks: list[dict], source_mtime: float, k1: float = 1.2, b: float = 0.75) -> "LexicalShard":
+        postings: dict[str, list[tuple[int, int]]] = {}
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+        for doc, chunk in enumerate(chunks):
+            counts: dict[str, int] = {}
+            for term in tokenize(chunk.get("content", "")):
+                counts[term] = counts.get(term, 0) + 1
+            lengths[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(postings[t]) for t in terms])
+        docs = np.empty(int(offsets[-1]), dtype=np.int32)
+        tfs = np.empty(int(offsets[-1]), dtype=np.float32)
+        idf = np.empty(len(terms), dtype=np.float32)
+        n = len(chunks)
+        for i, term in enumerate(terms):
+            entries = postings[term]
+            docs[offsets[i]:offsets[i + 1]] = [d for d, _ in entries]
+            tfs[offsets[i]:offsets[i + 1]] = [tf for _, tf in entries]
+            idf[i] = np.log(1 + (n - len(entries) + 0.5) / (len(entries) + 0.5))
+
+        # Precompute the full BM25 term weight per posting, length norm included.
+        avg_length = float(lengths.mean()) if n and lengths.mean() > 0 else 1.0
+        norms = k1 * (1 - b + b * lengths / avg_length)
+        weights = np.repeat(idf, np.diff(offsets)) * tfs * (k1 + 1) / (tfs + norms[docs])
+        return cls(source_mtime, n, terms, offsets, docs, weights.astype(np.float32))
+
+    def scores(self, query: str) -> np.ndarray:
+        spans = [
+            slice(self.offsets[i], self.offsets[i + 1])
+            for i in (self.term_ids.get(term) for term in set(tokenize(query)))
+            if i is not None
+        ]
+        if not spans:
+            return np.zeros(self.num_docs, dtype=np.float32)
+        # One scatter-add over every query term's postings; a fancy-index
+        # += per term costs about twice as much on common terms.
+        return np.bincount(
+            np.concatenate([self.docs[s] for s in spans]),
+            weights=np.concatenate([self.weights[s] for s in spans]),
+            minlength=self.num_docs,
+        )
+
+
+class LexicalIndex:
+    """BM25 search over the chunks stored in a ``LocalVectorIndex``.
+
+    Each course shard gets a ``lexical.npz`` beside its ``chunks.json``,
+    written by ``build`` at index time. A shard built from an older
+    ``chunks.json`` is rebuilt in memory on first use.
+    """
+
+    def __init__(self, store: LocalVectorIndex):
+        self.store = store
+        self._shards: dict[str, LexicalShard] = {}
+
+    def _paths(self, course_id: str) -> tuple[str, str]:
+        shard_dir = os.path.join(self.store.index_dir, course_id)
+        return os.path.join(shard_dir, LEXICAL_FILE), os.path.join(shard_dir, CHUNKS_FILE)
+
+    def build(self, course_id: str) -> int:
+        """Build and save the course's inverted index from its current chunks; returns the term count."""
+        lexical_path, chunks_path = self._paths(course_id)
+        _, chunks = self.store.load(course_id)
+        if not chunks:
+            return 0
+        shard = LexicalShard.build(chunks, os.path.getmtime(chunks_path))
+        terms = np.array(sorted(shard.term_ids, key=shard.term_ids.get))
+        tmp_path = lexical_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                source_mtime=np.float64(shard.source_mtime),
+                num_docs=np.int64(shard.num_docs),
+                terms=terms,
+                offsets=shard.offsets,
+                docs=shard.docs,
+                weights=shard.weights,
+            )
+        os.replace(tmp_path, lexical_path)
+        self._shards[course_id] = shard
+        return len(terms)
+
+    def load(self, course_id: str, chunks: list[dict]) -> Optional[LexicalShard]:
+        lexical_path, chunks_path = self._paths(course_id)
+        try:
+            source_mtime = os.path.getmtime(chunks_path)
+        except OSError:
+            return None
+
+        def current(shard: Optional[LexicalShard]) -> bool:
+            return shard is not None and shard.source_mtime == source_mtime and shard.num_docs == len(chunks)
+
+        shard = self._shards.get(course_id)
+        if current(shard):
+            return shard
+        try:
+            with np.load(lexical_path) as data:
+                shard = LexicalShard(
+                    float(data["source_mtime"]),
+                    int(data["num_docs"]),
+                    data["terms"].tolist(),
+                    data["offsets"],
+                    data["docs"],
+                    data["weights"],
+                )
+        except (OSError, KeyError, ValueError):
+            shard = None
+        if not current(shard):
+            shard = LexicalShard.build(chunks, source_mtime)
+        self._shards[course_id] = shard
+        return shard
+
+    def warm(self) -> int:
+        """Load every course's postings; returns the total number of terms."""
+        total = 0
+        for course_id in self.store.course_ids():
+            _, chunks = self.store.load(course_id)
+            shard = self.load(course_id, chunks) if chunks else None
+            total += len(shard.term_ids) if shard else 0
+        return total
+
+    def search(self, query: str, course_id: Optional[str] = None, top_k: int = 5) -> list[dict]:
+        """Return the top_k chunks by BM25 score, searching every course if none is given."""
+        course_ids = [course_id] if course_id else self.store.course_ids()
+        results: list[dict] = []
+        for cid in course_ids:
+            _, chunks = self.store.load(cid)
+            shard = self.load(cid, chunks) if chunks else None
+            if shard is None:
+                continue
+            scores = shard.scores(query)
+            for i in top_indices(scores, top_k):
+                if scores[i] <= 0:
+                    break
+                results.append({**chunks[i], "score": float(scores[i])})
+
+        if len(course_ids) > 1:
+            results.sort(key=lambda c: c["score"], reverse=True)
+            results = results[:top_k]
+        return results
@@ -0,0 +1,73 @@
+"""Offline text embeddings: hashed character n-grams projected into a small dense space."""
+
+import re
+import unicodedata
+
+import numpy as np
+
+# Letters and digits of any script are word characters; "_" separates words like punctuation.
+NON_WORD = re.compile(r"[\W_]+")
+NGRAM_SIZES = (3, 4, 5)
+# Odd 64-bit multipliers: one rolls the n-gram hash, the others spread it over dimensions.
+ROLL = np.uint64(0x100000001B3)
+MIXERS = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F))
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase words separated by single spaces, padded so n-grams see word boundaries.
+
+    NFKC folds composed and decomposed accents (and full-width forms) together.
+    """
+    return f" {NON_WORD.sub(' ', unicodedata.normalize('NFKC', text).lower()).strip()} "
+
+
+class HashingEmbedder:
+    """Embeds texts without a model or a network call.
+
+    Every 3-, 4- and 5-byte n-gram of the normalized UTF-8 text is hashed to
+    ``len(MIXERS)`` dimensions with a random sign each, which is a sparse
+    random projection of the n-gram counts. Texts sharing words and word
+    stems land close in cosine distance. A whole batch is hashed and
+    projected with a handful of vectorized NumPy operations.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.model = f"local-hash-ngram-{dim}"
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """One L2-normalized float32 row per text."""
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        normalized = [normalize_text(t) for t in texts]
+        data = np.frombuffer("\0".join(normalized).encode("utf-8"), dtype=np.uint8)
+        # Row of each byte; the \0 separators mark where one text ends.
+        doc_of = np.cumsum(data == 0, dtype=np.int64)
+
+        positions, rows = [], []
+        for n in NGRAM_SIZES:
+            if len(data) < n:
+                continue
+            count = len(data) - n + 1
+            hashes = np.zeros(count, dtype=np.uint64)
+            for offset in range(n):
+                hashes = hashes * ROLL + data[offset:offset + count]
+            # Drop n-grams that straddle two texts or start on a separator.
+            inside = (doc_of[:count] == doc_of[n - 1:n - 1 + count]) & (data[:count] != 0)
+            hashes = hashes[inside] + np.uint64(n)
+            docs = doc_of[:count][inside]
+            for mixer in MIXERS:
+                mixed = hashes * mixer
+                mixed ^= mixed >> np.uint64(29)
+                positions.append(mixed)
+                rows.append(docs)
+
+        mixed = np.concatenate(positions) if positions else np.zeros(0, dtype=np.uint64)
+        docs = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        dims = (mixed % np.uint64(self.dim)).astype(np.int64)
+        signs = np.where(mixed & np.uint64(1 << 40), 1.0, -1.0)
+        vectors = np.bincount(docs * self.dim + dims, weights=signs, minlength=len(texts) * self.dim)
+        vectors = vectors.reshape(len(texts), self.dim).astype(np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
@@ -0,0 +1,295 @@
+"""In-process vector index over memory-mapped embedding matrices."""
+
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+
+VECTORS_FILE = "vectors.npy"
+CHUNKS_FILE = "chunks.json"
+QUANTIZED_FILE = "vectors.q.npy"
+SCALES_FILE = "scales.npy"
+# Names the vectors.npy the quantized files were built from; written after them.
+QUANTIZED_MANIFEST = "quantized.json"
+QUANTIZATIONS = ("int8", "float16", "off")
+# Values converted to float32 at a time while scoring a quantized matrix: 1 MiB,
+# small enough that the converted block is still in cache when it is multiplied.
+SCORE_BLOCK_VALUES = 1 << 18
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize a vector or each row of a matrix, leaving zero rows untouched."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def top_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Positions of the top_k scores, highest first."""
+    k = min(top_k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates])]
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """Compact codes for normalized vectors, and per-row scales for int8 (None for float16)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if quantization == "float16":
+        return vectors.astype(np.float16), None
+    scales = (np.abs(vectors).max(axis=1) / 127).astype(np.float32)
+    scales[scales == 0] = 1.0
+    codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+    return codes, scales
+
+
+def quantized_scores(codes: np.ndarray, scales: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+    """Approximate ``vectors @ query`` from quantized codes, a block of rows at a time."""
+    rows, dim = codes.shape
+    step = max(1, SCORE_BLOCK_VALUES // max(dim, 1))
+    scores = np.empty(rows, dtype=np.float32)
+    buffer = np.empty((min(step, rows), dim), dtype=np.float32)
+    for start in range(0, rows, step):
+        block = codes[start:start + step]
+        converted = buffer[:len(block)]
+        converted[...] = block
+        np.matmul(converted, query, out=scores[start:start + len(block)])
+    if scales is not None:
+        scores *= scales
+    return scores
+
+
+class VectorShard:
+    """One course's matrices: full-precision vectors and, optionally, their quantized codes."""
+
+    __slots__ = ("mtime", "vectors", "chunks", "codes", "scales")
+
+    def __init__(self, mtime: float, vectors: np.ndarray, chunks: list[dict], codes=None, scales=None):
+        self.mtime = mtime
+        self.vectors = vectors
+        self.chunks = chunks
+        self.codes = codes
+        self.scales = scales
+
+
+class LocalVectorIndex:
+    """Stores normalized embeddings per course and answers top-k cosine queries locally.
+
+    Each course is a shard directory holding a float32 ``vectors.npy`` matrix
+    (opened memory-mapped) and a ``chunks.json`` list of chunk dicts whose
+    positions match the matrix rows.
+
+    With ``RAG_QUANTIZATION=int8`` or ``float16`` the shard also stores the
+    vectors as int8 codes with a per-row scale or as float16 in
+    ``vectors.q.npy``. Searches score that compact matrix, then re-rank the
+    best ``rerank_factor * top_k`` rows against the float32 rows, which are
+    read from disk only for that shortlist. Resident memory is then about a
+    quarter (int8) or half (float16) of the float32 matrix. The default is
+    ``off``: at 1536 dimensions int8 scans about as fast as float32, but a
+    small shard that fits in cache pays for the int8 conversion (~1.4x at
+    5000 x 256), so only shards too large to keep in memory should opt in.
+    NumPy's float16 conversion makes that mode much slower.
+    """
+
+    def __init__(
+        self,
+        index_dir: Optional[str] = None,
+        quantization: Optional[str] = None,
+        rerank_factor: Optional[int] = None,
+    ):
+        self.index_dir = index_dir or os.getenv("RAG_INDEX_DIR", "./data/index")
+        self.quantization = (quantization or os.getenv("RAG_QUANTIZATION", "off")).lower()
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(f"RAG_QUANTIZATION must be one of {QUANTIZATIONS}, got {self.quantization!r}")
+        self.rerank_factor = rerank_factor or int(os.getenv("RAG_RERANK_FACTOR", "8"))
+        self._shards: dict[str, VectorShard] = {}
+
+    def _shard_dir(self, course_id: str) -> str:
+        return os.path.join(self.index_dir, course_id)
+
+    def course_ids(self) -> list[str]:
+        """List the courses that have a shard on disk."""
+        if not os.path.isdir(self.index_dir):
+            return []
+        return sorted(
+            name for name in os.listdir(self.index_dir)
+            if os.path.exists(os.path.join(self.index_dir, name, VECTORS_FILE))
+        )
+
+    def version(self, course_id: str) -> Optional[int]:
+        """Changes whenever the course shard is rewritten; None if it has no shard."""
+        try:
+            return os.stat(os.path.join(self._shard_dir(course_id), VECTORS_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    def load(self, course_id: str) -> tuple[np.ndarray, list[dict]]:
+        """Return the (vectors, chunks) for a course, reopening the shard if it changed on disk."""
+        shard = self._shard(course_id)
+        if shard is None:
+            return np.empty((0, 0), dtype=np.float32), []
+        return shard.vectors, shard.chunks
+
+    def _shard(self, course_id: str) -> Optional[VectorShard]:
+        shard_dir = self._shard_dir(course_id)
+        path = os.path.join(shard_dir, VECTORS_FILE)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        cached = self._shards.get(course_id)
+        if cached and cached.mtime == mtime:
+            return cached
+
+        vectors = np.load(path, mmap_mode="r")
+        with open(os.path.join(shard_dir, CHUNKS_FILE)) as f:
+            chunks = json.load(f)
+        if vectors.ndim != 2 or vectors.shape[0] != len(chunks):
+            return None
+        shard = VectorShard(mtime, vectors, chunks)
+        if self.quantization != "off" and len(chunks):
+            shard.codes, shard.scales = self._load_quantized(shard_dir, vectors)
+        self._shards[course_id] = shard
+        return shard
+
+    def _load_quantized(self, shard_dir: str, vectors: np.ndarray) -> tuple[np.ndarray, Optional[np.ndarray]]:
+        """The shard's stored codes, or codes built in memory for shards written without them."""
+        expected = np.int8 if self.quantization == "int8" else np.float16
+        try:
+            # Codes from a write interrupted before its manifest belong to other vectors.
+            with open(os.path.join(shard_dir, QUANTIZED_MANIFEST)) as f:
+                if json.load(f) != self._source_stamp(shard_dir):
+                    return quantize(vectors, self.quantization)
+            codes = np.load(os.path.join(shard_dir, QUANTIZED_FILE), mmap_mode="r")
+            scales = np.load(os.path.join(shard_dir, SCALES_FILE)) if expected == np.int8 else None
+            if codes.dtype == expected and codes.shape == vectors.shape and (scales is None or len(scales) == len(codes)):
+                return codes, scales
+        except (OSError, ValueError):
+            pass
+        return quantize(vectors, self.quantization)
+
+    @staticmethod
+    def _source_stamp(shard_dir: str) -> dict:
+        """Identifies the current vectors.npy; each write replaces it with a new file."""
+        stat = os.stat(os.path.join(shard_dir, VECTORS_FILE))
+        return {"inode": stat.st_ino, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    def warm(self) -> int:
+        """Open every course shard and fault its pages in; returns the number of chunks loaded."""
+        total = 0
+        for course_id in self.course_ids():
+            shard = self._shard(course_id)
+            if shard is None:
+                continue
+            if len(shard.chunks):
+                # Reading the matrix that searches scan pulls it into the page cache;
+                # float32 rows stay on disk until a re-rank needs them.
+                float(np.asarray(shard.codes if shard.codes is not None else shard.vectors).sum(dtype=np.float64))
+            total += len(shard.chunks)
+        return total
+
+    def upsert(self, course_id: str, chunks: list[dict], embeddings: list[list[float]]) -> int:
+        """Insert or replace chunks (matched by ``id``) in a course shard."""
+        if not chunks:
+            return 0
+
+        vectors, existing = self.load(course_id)
+        new_vectors = normalize(np.asarray(embeddings, dtype=np.float32))
+        replace_ids = {c["id"] for c in chunks}
+        keep = [i for i, c in enumerate(existing) if c.get("id") not in replace_ids]
+
+        if keep:
+            merged = np.concatenate([np.asarray(vectors[keep]), new_vectors])
+        else:
+            merged = new_vectors
+        self._write(course_id, merged, [existing[i] for i in keep] + list(chunks))
+        return len(chunks)
+
+    def delete(self, course_id: str, chunk_ids: set[str]) -> int:
+        """Remove chunks by id from a course shard."""
+        vectors, existing = self.load(course_id)
+        keep = [i for i, c in enumerate(existing) if c.get("id") not in chunk_ids]
+        removed = len(existing) - len(keep)
+        if removed:
+            self._write(course_id, np.asarray(vectors[keep]), [existing[i] for i in keep])
+        return removed
+
+    def _write(self, course_id: str, vectors: np.ndarray, chunks: list[dict]):
+        shard_dir = self._shard_dir(course_id)
+        os.makedirs(shard_dir, exist_ok=True)
+
+        # Write both files beside the live ones and swap them in; load() rejects
+        # the brief window where the two files disagree on length.
+        tmp_vectors = os.path.join(shard_dir, VECTORS_FILE + ".tmp")
+        tmp_chunks = os.path.join(shard_dir, CHUNKS_FILE + ".tmp")
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, vectors)
+        with open(tmp_chunks, "w") as f:
+            json.dump(chunks, f)
+        os.replace(tmp_chunks, os.path.join(shard_dir, CHUNKS_FILE))
+        # vectors.npy's mtime is what tells readers to reload.
+        os.replace(tmp_vectors, os.path.join(shard_dir, VECTORS_FILE))
+        self._shards.pop(course_id, None)
+        if self.quantization == "off":
+            return
+
+        # The quantized files follow, then the manifest naming the vectors they
+        # match; until it is written (or after a crash) readers quantize in memory.
+        codes, scales = quantize(vectors, self.quantization)
+        for name, array in ((QUANTIZED_FILE, codes), (SCALES_FILE, scales)):
+            if array is not None:
+                with open(os.path.join(shard_dir, name + ".tmp"), "wb") as f:
+                    np.save(f, array)
+                os.replace(os.path.join(shard_dir, name + ".tmp"), os.path.join(shard_dir, name))
+        tmp_manifest = os.path.join(shard_dir, QUANTIZED_MANIFEST + ".tmp")
+        with open(tmp_manifest, "w") as f:
+            json.dump(self._source_stamp(shard_dir), f)
+        os.replace(tmp_manifest, os.path.join(shard_dir, QUANTIZED_MANIFEST))
+
+    def search(
+        self,
+        query_vector: list[float],
+        course_id: Optional[str] = None,
+        top_k: int = 5,
+    ) -> list[dict]:
+        """Return the top_k chunks by cosine similarity, searching every course if none is given."""
+        query = normalize(np.asarray(query_vector, dtype=np.float32))
+        course_ids = [course_id] if course_id else self.course_ids()
+
+        results: list[dict] = []
+        for cid in course_ids:
+            shard = self._shard(cid)
+            if shard is None or not shard.chunks:
+                continue
+            if shard.vectors.shape[1] != query.shape[0]:
+                print(f"Local index dimension mismatch for course {cid}: "
+                      f"{shard.vectors.shape[1]} != {query.shape[0]}")
+                continue
+            for i, score in self._ranked(shard, query, top_k):
+                results.append({**shard.chunks[i], "score": score})
+
+        if len(course_ids) > 1:
+            results.sort(key=lambda c: c["score"], reverse=True)
+            results = results[:top_k]
+        return results
+
+    def _ranked(self, shard: VectorShard, query: np.ndarray, top_k: int) -> list[tuple[int, float]]:
+        """(row, exact cosine score) of the shard's top_k rows, best first."""
+        if shard.codes is None:
+            scores = shard.vectors @ query
+            return [(int(i), float(scores[i])) for i in top_indices(scores, top_k)]
+
+        shortlist = top_indices(quantized_scores(shard.codes, shard.scales, query), top_k * self.rerank_factor)
+        # Sorted rows make the mmap read the shortlist front to back.
+        rows = np.sort(shortlist)
+        exact = np.asarray(shard.vectors[rows]) @ query
+        return [(int(rows[i]), float(exact[i])) for i in top_indices(exact, top_k)]
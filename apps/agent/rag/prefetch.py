@@ -0,0 +1,133 @@
+"""Speculative curriculum retrieval on interim speech-to-text transcripts."""
+
+import asyncio
+import os
+import re
+import unicodedata
+from typing import Awaitable, Callable, Optional
+
+
+# [^\W_] is a letter or digit in any script, as in rag.lexical_index.
+WORD_PATTERN = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+
+
+def query_words(text: str) -> tuple[str, ...]:
+    return tuple(WORD_PATTERN.findall(unicodedata.normalize("NFKC", text).lower()))
+
+
+def word_similarity(a: tuple[str, ...], b: tuple[str, ...]) -> float:
+    """Jaccard similarity of two word sequences; 0.0 if either has no words."""
+    sa, sb = set(a), set(b)
+    if not sa or not sb:
+        return 0.0
+    return len(sa & sb) / len(sa | sb)
+
+
+class SpeculativePrefetcher:
+    """Starts retrieval while the student is still speaking.
+
+    ``observe`` is fed every interim transcript. Once the leading words of two
+    consecutive hypotheses agree (and there are at least ``min_words`` of
+    them) a retrieval for that stable prefix starts; prefetches the transcript
+    has moved away from are cancelled. ``take`` hands the final turn text a
+    prefetched result when their words are similar enough.
+    """
+
+    def __init__(
+        self,
+        retrieve: Callable[[str], Awaitable[list[dict]]],
+        min_words: int = 3,
+        similarity: Optional[float] = None,
+        max_pending: int = 3,
+    ):
+        self.retrieve = retrieve
+        self.min_words = min_words
+        self.similarity = (
+            similarity if similarity is not None
+            else float(os.getenv("PREFETCH_SIMILARITY", "0.8"))
+        )
+        self.max_pending = max_pending
+        self._prefetches: list[tuple[tuple[str, ...], asyncio.Task]] = []
+        self._previous: tuple[str, ...] = ()
+        self.launched = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+
+    def observe(self, transcript: str, is_final: bool = False):
+        """Consider an STT hypothesis for speculative retrieval."""
+        words = query_words(transcript)
+        if is_final:
+            stable = words
+        else:
+            stable = self._common_prefix(words, self._previous)
+        self._previous = () if is_final else words
+
+        # Drop prefetches for words the recognizer has since revised.
+        for entry in list(self._prefetches):
+            query = entry[0]
+            if words[: len(query)] != query:
+                self._discard(entry)
+
+        if len(stable) < self.min_words:
+            return
+        if self._prefetches and self._prefetches[-1][0] == stable:
+            return
+
+        task = asyncio.ensure_future(self.retrieve(" ".join(stable)))
+        self._prefetches.append((stable, task))
+        self.launched += 1
+        while len(self._prefetches) > self.max_pending:
+            self._discard(self._prefetches[0])
+
+    async def take(self, final_text: str) -> Optional[list[dict]]:
+        """Return a prefetched result matching the final text, or None on a miss."""
+        words = query_words(final_text)
+        match = None
+        for entry in reversed(self._prefetches):
+            if word_similarity(entry[0], words) >= self.similarity:
+                match = entry
+                break
+
+        for entry in list(self._prefetches):
+            if entry is not match:
+                self._discard(entry)
+        self._prefetches.clear()
+        self._previous = ()
+
+        if match is None:
+            self.misses += 1
+            return None
+        try:
+            result = await match[1]
+        except Exception:
+            self.misses += 1
+            self.wasted += 1
+            return None
+        self.hits += 1
+        return result
+
+    def _discard(self, entry: tuple[tuple[str, ...], asyncio.Task]):
+        entry[1].cancel()
+        self._prefetches.remove(entry)
+        self.wasted += 1
+
+    @staticmethod
+    def _common_prefix(a: tuple[str, ...], b: tuple[str, ...]) -> tuple[str, ...]:
+        n = 0
+        for x, y in zip(a, b):
+            if x != y:
+                break
+            n += 1
+        return a[:n]
+
+    def metrics(self) -> dict:
+        turns = self.hits + self.misses
+        return {
+            "launched": self.launched,
+            "hits": self.hits,
+            "misses": self.misses,
+            "wasted": self.wasted,
+            "hit_rate": self.hits / turns if turns else 0.0,
+            "waste_rate": self.wasted / self.launched if self.launched else 0.0,
+        }
@@ -0,0 +1,96 @@
+"""Session-scoped semantic cache of curriculum retrieval results."""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from .local_index import normalize
+
+
+class SemanticQueryCache:
+    """Caches retrieval results keyed by query embedding.
+
+    A lookup hits when a stored query for the same course has cosine
+    similarity of at least ``threshold`` and was retrieved with a top_k at
+    least as large as the one requested (so a top_k=5 result serves
+    top_k=3). Entries expire after ``ttl`` seconds and the least recently used
+    one is evicted beyond ``max_entries``.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        ttl: float = 900.0,
+        max_entries: int = 64,
+    ):
+        self.threshold = (
+            threshold if threshold is not None
+            else float(os.getenv("QUERY_CACHE_SIMILARITY", "0.95"))
+        )
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (course_id, top_k, stored_at, vector, results)
+        self._entries: OrderedDict[int, tuple] = OrderedDict()
+        self._next_key = 0
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: list[int] = []
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query_vector, course_id: Optional[str], top_k: int) -> Optional[list[dict]]:
+        """Return cached results for a similar query, or None."""
+        self._expire()
+        if not self._entries:
+            self.misses += 1
+            return None
+
+        if self._matrix is None:
+            self._matrix_keys = list(self._entries)
+            self._matrix = np.stack([self._entries[k][3] for k in self._matrix_keys])
+        scores = self._matrix @ normalize(query_vector)
+
+        for i in np.argsort(-scores):
+            if scores[i] < self.threshold:
+                break
+            key = self._matrix_keys[i]
+            entry_course, entry_top_k, _, _, results = self._entries[key]
+            if entry_course == course_id and entry_top_k >= top_k:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return results[:top_k]
+
+        self.misses += 1
+        return None
+
+    def put(self, query_vector, course_id: Optional[str], top_k: int, results: list[dict]):
+        key = self._next_key
+        self._next_key += 1
+        self._entries[key] = (course_id, top_k, time.monotonic(), normalize(query_vector), results)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._matrix = None
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        expired = [k for k, entry in self._entries.items() if entry[2] < cutoff]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the cached query vectors; the cached result lists are not counted."""
+        vectors = sum(entry[3].nbytes for entry in self._entries.values())
+        return vectors + (self._matrix.nbytes if self._matrix is not None else 0)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
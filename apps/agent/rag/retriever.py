@@ -1,29 +1,159 @@
 """Curriculum content retriever using vector similarity search."""
 
+import asyncio
 import os
+import threading
+from collections import OrderedDict
 from typing import Optional
 
+from .embeddings import EmbeddingGenerator
+from .lexical_index import LexicalIndex
+from .local_index import LocalVectorIndex
+from .query_cache import SemanticQueryCache
+
+
+def reciprocal_rank_fusion(rankings: list[list[dict]], top_k: int, k: int = 60) -> list[dict]:
+    """Merge ranked chunk lists by summed 1 / (k + rank), scaled so the best chunk scores 1."""
+    fused: dict[str, float] = {}
+    chunks: dict[str, dict] = {}
+    for ranking in rankings:
+        for rank, chunk in enumerate(ranking):
+            key = chunk.get("id") or chunk.get("content", "")
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank + 1)
+            chunks.setdefault(key, chunk)
+    best = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    if not best:
+        return []
+    top = fused[best[0]]
+    return [{**chunks[key], "score": fused[key] / top} for key in best]
+
 
 class CurriculumRetriever:
-    """Retrieves relevant curriculum content using vector similarity search."""
+    """Retrieves relevant curriculum content using vector similarity search.
 
-    def __init__(self):
+    The backend is chosen with ``RAG_BACKEND``: ``pinecone`` (default) queries
+    the hosted index, ``local`` searches the in-process index under
+    ``RAG_INDEX_DIR``. Calls that pass a ``session_id`` share a
+    ``SemanticQueryCache`` until ``end_session`` is called.
+
+    The local backend also ranks chunks by BM25 and fuses both rankings
+    (``RAG_LEXICAL=off`` disables this). If the query embedding takes longer
+    than half of ``TURN_ENRICH_DEADLINE_MS`` (``RAG_EMBED_TIMEOUT_MS`` may set
+    it lower) or fails, the BM25 ranking is returned on its own, in time for
+    the turn; the embedding keeps running so it is cached for next time.
+    """
+
+    def __init__(self, backend: Optional[str] = None, max_sessions: int = 1024):
+        self.backend = (backend or os.getenv("RAG_BACKEND", "pinecone")).lower()
         self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
         self.index_name = os.getenv("PINECONE_INDEX", "eduavatar-curriculum")
+        self.embeddings = EmbeddingGenerator()
+        self.local_index = LocalVectorIndex() if self.backend == "local" else None
+        self.lexical_index = (
+            LexicalIndex(self.local_index)
+            if self.local_index is not None and os.getenv("RAG_LEXICAL", "on") != "off"
+            else None
+        )
+        # Leave half the turn's enrichment budget for the searches after the embedding.
+        enrich_budget_ms = float(os.getenv("TURN_ENRICH_DEADLINE_MS", "150")) / 2
+        self.embed_timeout = min(float(os.getenv("RAG_EMBED_TIMEOUT_MS", enrich_budget_ms)), enrich_budget_ms) / 1000
+        self.lexical_fallbacks = 0
+        self.max_sessions = max_sessions
+        self._session_caches: OrderedDict[str, SemanticQueryCache] = OrderedDict()
+        self._sessions_lock = threading.Lock()
 
     async def retrieve(
         self,
         query: str,
         course_id: Optional[str] = None,
         top_k: int = 5,
+        session_id: Optional[str] = None,
     ) -> list[dict]:
         """Retrieve relevant curriculum chunks for a query."""
-        if not self.pinecone_api_key:
+        if self.local_index is None and not self.pinecone_api_key:
             return []
 
+        query_vector = await self._embed_query(query)
+        if query_vector is None:
+            if self.lexical_index is None:
+                return []
+            self.lexical_fallbacks += 1
+            return self._lexical_search(query, course_id, top_k)
+
+        cache = self.session_cache(session_id) if session_id else None
+        if cache is not None:
+            cached = cache.get(query_vector, course_id, top_k)
+            if cached is not None:
+                return cached
+
         try:
-            # TODO: Implement Pinecone query when API key is configured
-            return []
+            if self.lexical_index is not None:
+                candidates = max(top_k * 4, 20)
+                results = reciprocal_rank_fusion([
+                    self._search(query_vector, course_id, candidates),
+                    self.lexical_index.search(query, course_id, candidates),
+                ], top_k)
+            else:
+                results = self._search(query_vector, course_id, top_k)
         except Exception as e:
             print(f"RAG retrieval error: {e}")
             return []
+
+        if cache is not None:
+            cache.put(query_vector, course_id, top_k, results)
+        return results
+
+    async def _embed_query(self, query: str) -> Optional[list[float]]:
+        if self.lexical_index is None:
+            return await self.embeddings.generate(query)
+        task = asyncio.ensure_future(self.embeddings.generate(query))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=self.embed_timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _lexical_search(self, query: str, course_id: Optional[str], top_k: int) -> list[dict]:
+        try:
+            results = self.lexical_index.search(query, course_id, top_k)
+        except Exception as e:
+            print(f"RAG lexical retrieval error: {e}")
+            return []
+        # BM25 scores are unbounded; scale them like the fused scores.
+        top = results[0]["score"] if results else 1.0
+        return [{**c, "score": c["score"] / top} for c in results]
+
+    def _search(self, query_vector: list[float], course_id: Optional[str], top_k: int) -> list[dict]:
+        if self.local_index is not None:
+            return self.local_index.search(query_vector, course_id=course_id, top_k=top_k)
+
+        # TODO: Implement Pinecone query when API key is configured
+        return []
+
+    def index_version(self, course_id: Optional[str]) -> Optional[tuple]:
+        """Changes when the indexer rewrites the course (or any course, if none is given)."""
+        if self.local_index is None:
+            return None
+        course_ids = [course_id] if course_id else self.local_index.course_ids()
+        return tuple(self.local_index.version(cid) for cid in course_ids)
+
+    def session_cache(self, session_id: str) -> SemanticQueryCache:
+        """The query cache for a session, created on first use."""
+        with self._sessions_lock:
+            cache = self._session_caches.get(session_id)
+            if cache is None:
+                cache = self._session_caches[session_id] = SemanticQueryCache()
+                while len(self._session_caches) > self.max_sessions:
+                    self._session_caches.popitem(last=False)
+            else:
+                self._session_caches.move_to_end(session_id)
+            return cache
+
+    def session_memory_bytes(self, session_id: str) -> int:
+        cache = self._session_caches.get(session_id)
+        return cache.memory_bytes() if cache is not None else 0
+
+    def end_session(self, session_id: str) -> Optional[dict]:
+        """Drop a session's query cache and return its final stats."""
+        with self._sessions_lock:
+            cache = self._session_caches.pop(session_id, None)
+        return cache.stats() if cache else None
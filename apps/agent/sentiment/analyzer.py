@@ -1,5 +1,9 @@
 """Voice and text sentiment analysis."""
 
+from typing import Optional
+
+from utils.keywords import KeywordMatcher
+
 
 class SentimentAnalyzer:
     """Analyzes student sentiment from text and voice features."""
@@ -23,16 +27,56 @@ class SentimentAnalyzer:
         ],
     }
 
-    async def analyze(self, text: str) -> str:
-        """Analyze text for sentiment indicators."""
+    # Breaks ties between sentiments with the same number of keyword hits.
+    SENTIMENT_PRIORITY = ["confused", "frustrated", "excited", "bored"]
+
+    MATCHER = KeywordMatcher(SENTIMENT_KEYWORDS)
+
+    # Prosody cues (see sentiment.prosody) used when the words carry no sentiment.
+    PROSODY_THRESHOLDS = {
+        "hesitant_pause_ratio": 0.45,
+        "hesitant_rate": 2.5,
+        "animated_pitch_std_hz": 40.0,
+        "animated_rate": 4.5,
+        "flat_pitch_std_hz": 12.0,
+        "quiet_energy_db": -35.0,
+    }
+
+    def __init__(self, keywords: Optional[dict[str, list[str]]] = None):
+        self.matcher = KeywordMatcher(keywords) if keywords else self.MATCHER
+
+    def keyword_hits(self, text: str) -> dict[str, int]:
+        """Count keyword hits for each sentiment."""
+        return self.matcher.counts(text)
+
+    async def analyze(self, text: str, prosody: Optional[dict] = None) -> str:
+        """Analyze text, and optionally the turn's prosody features, for sentiment indicators."""
         text_lower = text.lower().strip()
 
-        for sentiment, keywords in self.SENTIMENT_KEYWORDS.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    return sentiment
+        sentiment = self.matcher.best(text_lower, self.SENTIMENT_PRIORITY)
+        if sentiment:
+            return sentiment
+
+        if prosody:
+            sentiment = self.analyze_prosody(prosody)
+            if sentiment:
+                return sentiment
 
         if len(text_lower.split()) < 3:
             return "disengaged"
 
         return "neutral"
+
+    def analyze_prosody(self, features: dict) -> Optional[str]:
+        """Map a turn's prosody features to a sentiment, or None if they are unremarkable."""
+        t = self.PROSODY_THRESHOLDS
+        if not features.get("duration"):
+            return None
+        voiced = features["pitch_hz"] > 0
+        if features["pause_ratio"] > t["hesitant_pause_ratio"] and features["speaking_rate"] < t["hesitant_rate"]:
+            return "confused"
+        if voiced and features["pitch_std_hz"] > t["animated_pitch_std_hz"] and features["speaking_rate"] > t["animated_rate"]:
+            return "excited"
+        if voiced and features["pitch_std_hz"] < t["flat_pitch_std_hz"] and features["energy_db"] < t["quiet_energy_db"]:
+            return "bored"
+        return None
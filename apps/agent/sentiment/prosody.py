@@ -0,0 +1,259 @@
+"""Streaming acoustic prosody features from the student's audio."""
+
+import math
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+PROSODY_FEATURES = (
+    "energy_db",
+    "energy_std_db",
+    "pitch_hz",
+    "pitch_std_hz",
+    "speaking_rate",
+    "pause_ratio",
+    "duration",
+)
+
+
+class ProsodyExtractor:
+    """Computes per-frame energy and pitch over a fixed ring buffer and aggregates them per turn.
+
+    Audio is box-filtered down to ~16 kHz, appended to a preallocated ring
+    holding one 40 ms analysis window, and each pushed frame is analysed
+    in place: RMS energy, autocorrelation pitch (75-400 Hz) and a speech /
+    pause decision. Energy peaks during speech approximate syllable nuclei
+    for the speaking rate. No sample buffers are allocated after
+    construction, so one instance per room keeps up with 16/48 kHz audio.
+    """
+
+    WINDOW_SECONDS = 0.04
+    MIN_PITCH_HZ = 75.0
+    MAX_PITCH_HZ = 400.0
+    VOICING_THRESHOLD = 0.45
+    SILENCE_DB = -45.0
+    SPEECH_ABOVE_FLOOR_DB = 10.0
+    NUCLEUS_DIP_DB = 3.0
+    MIN_NUCLEUS_GAP_SECONDS = 0.1
+    MAX_FRAME_SECONDS = 0.1
+
+    def __init__(self, sample_rate: int = 48000, num_channels: int = 1):
+        self._configure(sample_rate, num_channels)
+        self.reset_turn()
+
+    def _configure(self, sample_rate: int, num_channels: int):
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.decimation = sample_rate // 16000 if sample_rate % 16000 == 0 else 1
+        self.rate = sample_rate // self.decimation
+
+        self.window = int(self.rate * self.WINDOW_SECONDS)
+        self.min_lag = int(self.rate / self.MAX_PITCH_HZ)
+        self.max_lag = int(self.rate / self.MIN_PITCH_HZ)
+        self.segment = self.window - self.max_lag
+        self.max_chunk = min(self.window, int(self.rate * self.MAX_FRAME_SECONDS))
+
+        # Each sample is written at i and i + window, so the latest window is
+        # always the contiguous slice ring[pos : pos + window].
+        self._ring = np.zeros(2 * self.window, dtype=np.float32)
+        self._scratch = np.zeros(self.max_chunk, dtype=np.float32)
+        self._autocorr = np.zeros(self.max_lag - self.min_lag + 1, dtype=np.float32)
+        self._weighted = np.zeros_like(self._autocorr)
+        self._lag_energy = np.zeros_like(self._autocorr)
+        self._squares = np.zeros(self.window, dtype=np.float32)
+        self._cumulative = np.zeros(self.window + 1, dtype=np.float32)
+        # Favour shorter lags slightly so a multiple of the period never wins.
+        self._lag_weights = np.linspace(1.0, 0.8, len(self._autocorr), dtype=np.float32)
+        self._pos = 0
+        self._filled = 0
+        self._noise_floor_db = self.SILENCE_DB - self.SPEECH_ABOVE_FLOOR_DB
+        self._since_nucleus = 0.0
+        self._rising = False
+        self._local_min_db = 0.0
+        self._local_max_db = 0.0
+
+    def speech_started(self):
+        """VAD saw the student start speaking.
+
+        The first onset of a turn drops whatever was aggregated before it
+        (silence, the tutor talking), so the turn starts with the utterance.
+        """
+        if not self._in_turn:
+            self.reset_turn()
+            self._in_turn = True
+        self._speech_end = None
+
+    def speech_ended(self):
+        """VAD saw the student stop; features taken before they speak again end here."""
+        self._speech_end = self._aggregates()
+
+    def _aggregates(self) -> tuple:
+        return (
+            self._duration, self._speech_time, self._speech_frames,
+            self._energy_sum, self._energy_sq, self._voiced,
+            self._pitch_sum, self._pitch_sq, self._nuclei,
+        )
+
+    def reset_turn(self):
+        """Start aggregating a new turn."""
+        self._in_turn = False
+        self._speech_end = None
+        self._duration = 0.0
+        self._speech_time = 0.0
+        self._speech_frames = 0
+        self._energy_sum = 0.0
+        self._energy_sq = 0.0
+        self._voiced = 0
+        self._pitch_sum = 0.0
+        self._pitch_sq = 0.0
+        self._nuclei = 0
+
+    def push(self, pcm, sample_rate: Optional[int] = None, num_channels: Optional[int] = None):
+        """Consume one frame of interleaved int16 PCM (bytes, memoryview or ndarray)."""
+        if (sample_rate and sample_rate != self.sample_rate) or (
+            num_channels and num_channels != self.num_channels
+        ):
+            self._configure(sample_rate or self.sample_rate, num_channels or self.num_channels)
+
+        samples = np.frombuffer(pcm, dtype=np.int16)[:: self.num_channels]
+        step = self.max_chunk * self.decimation
+        for start in range(0, len(samples), step):
+            self._push_chunk(samples[start : start + step])
+
+    def _push_chunk(self, samples: np.ndarray):
+        n = len(samples) // self.decimation
+        if n == 0:
+            return
+        chunk = self._scratch[:n]
+        np.add.reduce(
+            samples[: n * self.decimation].reshape(n, self.decimation),
+            axis=1, dtype=np.float32, out=chunk,
+        )
+        np.multiply(chunk, 1.0 / (32768.0 * self.decimation), out=chunk)
+
+        w, pos = self.window, self._pos
+        first = min(n, w - pos)
+        self._ring[pos : pos + first] = chunk[:first]
+        self._ring[pos + w : pos + w + first] = chunk[:first]
+        rest = n - first
+        if rest:
+            self._ring[:rest] = chunk[first:]
+            self._ring[w : w + rest] = chunk[first:]
+        self._pos = (pos + n) % w
+        self._filled = min(w, self._filled + n)
+        self._analyze(n / self.rate)
+
+    def _analyze(self, frame_seconds: float):
+        self._duration += frame_seconds
+        self._since_nucleus += frame_seconds
+        if self._filled < self.window:
+            return
+
+        x = self._ring[self._pos : self._pos + self.window]
+        energy = float(np.dot(x, x)) / self.window
+        energy_db = 10.0 * math.log10(energy + 1e-10)
+
+        # Track the background level: drop to quieter frames at once, drift up slowly.
+        self._noise_floor_db = min(self._noise_floor_db, energy_db) + 0.005
+        threshold_db = max(self.SILENCE_DB, self._noise_floor_db + self.SPEECH_ABOVE_FLOOR_DB)
+
+        # A syllable nucleus is an energy peak that rose and then fell by
+        # NUCLEUS_DIP_DB, with the peak itself loud enough to be speech.
+        if self._rising:
+            self._local_max_db = max(self._local_max_db, energy_db)
+            if energy_db < self._local_max_db - self.NUCLEUS_DIP_DB:
+                if self._local_max_db > threshold_db and self._since_nucleus >= self.MIN_NUCLEUS_GAP_SECONDS:
+                    self._nuclei += 1
+                    self._since_nucleus = 0.0
+                self._rising = False
+                self._local_min_db = energy_db
+        else:
+            self._local_min_db = min(self._local_min_db, energy_db)
+            if energy_db > self._local_min_db + self.NUCLEUS_DIP_DB:
+                self._rising = True
+                self._local_max_db = energy_db
+
+        if energy_db <= threshold_db:
+            return
+
+        self._speech_time += frame_seconds
+        self._speech_frames += 1
+        self._energy_sum += energy_db
+        self._energy_sq += energy_db * energy_db
+
+        head = x[: self.segment]
+        r0 = float(np.dot(head, head))
+        if r0 <= 0.0:
+            return
+        lagged = sliding_window_view(x, self.segment)[self.min_lag : self.max_lag + 1]
+        np.matmul(lagged, head, out=self._autocorr)
+
+        # Normalise each lag by the energy of its own segment so a louder
+        # stretch of the window does not pull the estimate to a longer lag.
+        np.multiply(x, x, out=self._squares)
+        np.cumsum(self._squares, out=self._cumulative[1:])
+        seg, lo, hi = self.segment, self.min_lag, self.max_lag
+        np.subtract(self._cumulative[lo + seg : hi + seg + 1], self._cumulative[lo : hi + 1], out=self._lag_energy)
+        np.multiply(self._lag_energy, r0, out=self._lag_energy)
+        np.sqrt(self._lag_energy, out=self._lag_energy)
+        np.maximum(self._lag_energy, 1e-12, out=self._lag_energy)
+        np.divide(self._autocorr, self._lag_energy, out=self._autocorr)
+
+        np.multiply(self._autocorr, self._lag_weights, out=self._weighted)
+        best = int(np.argmax(self._weighted))
+        if self._autocorr[best] >= self.VOICING_THRESHOLD:
+            pitch = self.rate / (self.min_lag + best)
+            self._voiced += 1
+            self._pitch_sum += pitch
+            self._pitch_sq += pitch * pitch
+
+    def turn_features(self) -> dict:
+        """Aggregate prosody for the audio pushed since the last reset."""
+        def mean_std(total: float, squares: float, count: int) -> tuple[float, float]:
+            if not count:
+                return 0.0, 0.0
+            mean = total / count
+            return mean, max(0.0, squares / count - mean * mean) ** 0.5
+
+        energy, energy_std = mean_std(self._energy_sum, self._energy_sq, self._speech_frames)
+        pitch, pitch_std = mean_std(self._pitch_sum, self._pitch_sq, self._voiced)
+        return {
+            "energy_db": energy,
+            "energy_std_db": energy_std,
+            "pitch_hz": pitch,
+            "pitch_std_hz": pitch_std,
+            "speaking_rate": self._nuclei / self._speech_time if self._speech_time else 0.0,
+            "pause_ratio": 1.0 - self._speech_time / self._duration if self._duration else 0.0,
+            "duration": self._duration,
+        }
+
+    def turn_vector(self) -> np.ndarray:
+        """The turn features as a float32 vector ordered like PROSODY_FEATURES."""
+        features = self.turn_features()
+        return np.array([features[name] for name in PROSODY_FEATURES], dtype=np.float32)
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the analysis buffers."""
+        return sum(a.nbytes for a in (
+            self._ring, self._scratch, self._autocorr, self._weighted,
+            self._lag_energy, self._squares, self._cumulative, self._lag_weights,
+        ))
+
+    def take_turn_features(self) -> Optional[dict]:
+        """Return this turn's features (None if no audio arrived) and start a new turn.
+
+        With VAD events, the turn runs from the first ``speech_started`` to
+        the last ``speech_ended``: pauses between utterances count, the
+        trailing end-of-turn silence does not.
+        """
+        if self._speech_end is not None:
+            (
+                self._duration, self._speech_time, self._speech_frames,
+                self._energy_sum, self._energy_sq, self._voiced,
+                self._pitch_sum, self._pitch_sq, self._nuclei,
+            ) = self._speech_end
+        features = self.turn_features() if self._duration else None
+        self.reset_turn()
+        return features
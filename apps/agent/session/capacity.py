@@ -0,0 +1,211 @@
+"""Per-session CPU and memory accounting, and admission control for multi-session workers."""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+
+def thread_cpu_clock() -> Optional[int]:
+    """CPU clock of the calling thread, or None where the platform has none."""
+    try:
+        return time.pthread_getcpuclockid(threading.get_ident())
+    except (AttributeError, OSError):
+        return None
+
+
+def process_rss_bytes() -> int:
+    """Resident memory of this process (0 if unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class SessionMeter:
+    """CPU and memory used by one session.
+
+    In multi-session mode a job has a thread of its own, so that thread's
+    CPU clock is the session's CPU time. Work done for it on the shared
+    loop is not included. Memory is whatever ``memory_fn`` reports for the
+    session's own state.
+    """
+
+    def __init__(self, session_id: str, memory_fn: Optional[Callable[[], int]] = None):
+        self.session_id = session_id
+        self.memory_fn = memory_fn
+        self.clock = thread_cpu_clock()
+        self.started = time.monotonic()
+        self.cpu_start = self._cpu_now()
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+        self.closed = False
+
+    def _cpu_now(self) -> float:
+        if self.clock is None:
+            return 0.0
+        try:
+            return time.clock_gettime(self.clock)
+        except OSError:
+            # The job thread has exited.
+            return self.cpu_start + self.cpu_seconds
+
+    def update(self):
+        if not self.closed:
+            self.cpu_seconds = self._cpu_now() - self.cpu_start
+            self.wall_seconds = time.monotonic() - self.started
+
+    def sample(self) -> dict:
+        self.update()
+        memory = 0
+        if self.memory_fn is not None:
+            try:
+                memory = self.memory_fn()
+            except Exception as e:
+                print(f"Session memory accounting error: {e}")
+        return {
+            "session_id": self.session_id,
+            "cpu_seconds": round(self.cpu_seconds, 3),
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cpu_fraction": self.cpu_fraction(),
+            "memory_bytes": memory,
+        }
+
+    def cpu_fraction(self) -> float:
+        """Share of one core this session has used since it started."""
+        return round(self.cpu_seconds / self.wall_seconds, 4) if self.wall_seconds > 0 else 0.0
+
+    def close(self) -> dict:
+        usage = self.sample()
+        self.closed = True
+        return usage
+
+
+class AdmissionController:
+    """Decides how many sessions this worker process takes on.
+
+    Capacity is measured: the CPU fraction a session costs (averaged over
+    the live sessions and the last ``history`` finished ones that ran at
+    least ``min_sample_seconds``) divided into ``target_cpu`` of one core.
+    Until there is a measurement, ``sessions_per_core`` is assumed.
+    ``max_sessions`` caps it, and no job is taken while resident memory is
+    over ``memory_limit_mb``.
+
+    ``load`` is the worker's ``load_fnc`` and ``request_fnc`` its
+    ``request_fnc``. Jobs accepted but not yet started hold a reservation
+    for ``reservation_seconds`` so a burst of requests cannot overshoot.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        target_cpu: Optional[float] = None,
+        memory_limit_mb: Optional[float] = None,
+        sessions_per_core: Optional[int] = None,
+        min_sample_seconds: float = 30.0,
+        history: int = 50,
+        reservation_seconds: float = 30.0,
+    ):
+        self.max_sessions = max_sessions if max_sessions is not None else int(os.getenv("AGENT_MAX_SESSIONS", "0"))
+        self.target_cpu = target_cpu if target_cpu is not None else float(os.getenv("AGENT_TARGET_CPU", "0.7"))
+        self.memory_limit_mb = (
+            memory_limit_mb if memory_limit_mb is not None else float(os.getenv("AGENT_MEMORY_LIMIT_MB", "0"))
+        )
+        self.sessions_per_core = sessions_per_core or int(os.getenv("AGENT_SESSIONS_PER_CORE", "4"))
+        self.min_sample_seconds = min_sample_seconds
+        self.reservation_seconds = reservation_seconds
+        self._active: dict[str, SessionMeter] = {}
+        self._finished: deque[float] = deque(maxlen=history)
+        self._reservations: deque[float] = deque()
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.rejected = 0
+
+    def open(self, session_id: str, memory_fn: Optional[Callable[[], int]] = None) -> SessionMeter:
+        """Start accounting for a session; call from the session's own thread."""
+        meter = SessionMeter(session_id, memory_fn)
+        with self._lock:
+            if self._reservations:
+                self._reservations.popleft()
+            self._active[session_id] = meter
+        return meter
+
+    def close(self, session_id: str) -> Optional[dict]:
+        """Stop accounting for a session and return its final usage."""
+        with self._lock:
+            meter = self._active.pop(session_id, None)
+        if meter is None:
+            return None
+        usage = meter.close()
+        if meter.wall_seconds >= self.min_sample_seconds:
+            with self._lock:
+                self._finished.append(meter.cpu_fraction())
+        return usage
+
+    def usage(self) -> list[dict]:
+        with self._lock:
+            meters = list(self._active.values())
+        return [meter.sample() for meter in meters]
+
+    def capacity(self) -> int:
+        """Sessions this process can hold at ``target_cpu``."""
+        with self._lock:
+            fractions = list(self._finished)
+            meters = list(self._active.values())
+        for meter in meters:
+            meter.update()
+            if meter.wall_seconds >= self.min_sample_seconds:
+                fractions.append(meter.cpu_fraction())
+        per_session = sum(fractions) / len(fractions) if fractions else 0.0
+        if per_session > 0:
+            # Job threads share one interpreter, so the budget is one core whatever the machine has.
+            capacity = max(1, int(self.target_cpu / per_session))
+        else:
+            capacity = self.sessions_per_core
+        if self.max_sessions:
+            capacity = min(capacity, self.max_sessions)
+        return capacity
+
+    def _occupied(self) -> int:
+        with self._lock:
+            cutoff = time.monotonic() - self.reservation_seconds
+            while self._reservations and self._reservations[0] < cutoff:
+                self._reservations.popleft()
+            return len(self._active) + len(self._reservations)
+
+    def memory_full(self) -> bool:
+        return bool(self.memory_limit_mb) and process_rss_bytes() >= self.memory_limit_mb * 1024 * 1024
+
+    def load(self) -> float:
+        """Occupied fraction of capacity, 1.0 while over the memory limit."""
+        if self.memory_full():
+            return 1.0
+        return min(1.0, self._occupied() / self.capacity())
+
+    def admit(self) -> bool:
+        """Reserve a slot for a new session if there is room."""
+        if self.memory_full() or self._occupied() >= self.capacity():
+            self.rejected += 1
+            return False
+        with self._lock:
+            self._reservations.append(time.monotonic())
+        self.accepted += 1
+        return True
+
+    async def request_fnc(self, request):
+        """Accept a LiveKit job request while under capacity, reject it otherwise."""
+        if self.admit():
+            await request.accept()
+        else:
+            await request.reject()
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._active),
+            "capacity": self.capacity(),
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "rss_mb": round(process_rss_bytes() / 1024 / 1024, 1),
+        }
@@ -0,0 +1,50 @@
+"""The per-turn context message injected ahead of the student's words."""
+
+from typing import Optional
+
+from rag.context import ContextAssembler
+
+from .context_window import ContextWindow
+
+SENTIMENT_INSTRUCTIONS = {
+    "confused": "INSTRUCTION: Simplify your explanation. Use an analogy or example.",
+    "frustrated": "INSTRUCTION: Be encouraging. Break the problem into smaller steps.",
+    "bored": "INSTRUCTION: Make it more engaging. Ask a thought-provoking question.",
+}
+
+
+def build_context_message(
+    context_chunks: Optional[list[dict]],
+    sentiment: Optional[str],
+    current_objective: Optional[str],
+    context_window: ContextWindow,
+    assembler: ContextAssembler,
+) -> tuple[Optional[str], Optional[dict]]:
+    """Build a context injection message for the LLM, plus token stats if any chunks were retrieved."""
+    parts = []
+    stats = None
+
+    # Only inject chunks the LLM cannot already see from earlier turns.
+    context_chunks, skipped_tokens = context_window.filter_new(context_chunks or [])
+    if context_chunks:
+        context_chunks, stats = assembler.assemble(context_chunks)
+        context_window.record_injection(context_chunks)
+    if skipped_tokens:
+        stats = stats or {"chunks_in": 0, "chunks_out": 0, "tokens_in": 0, "tokens_out": 0, "tokens_saved": 0}
+        stats["tokens_skipped"] = skipped_tokens
+        stats["tokens_saved"] += skipped_tokens
+
+    if context_chunks:
+        parts.append("RELEVANT CURRICULUM CONTEXT:")
+        for chunk in context_chunks:
+            parts.append(f"- [{chunk.get('type', 'text')}] {chunk.get('content', '')}")
+
+    if sentiment and sentiment != "neutral":
+        parts.append(f"\nSTUDENT SENTIMENT: {sentiment}")
+        if sentiment in SENTIMENT_INSTRUCTIONS:
+            parts.append(SENTIMENT_INSTRUCTIONS[sentiment])
+
+    if current_objective:
+        parts.append(f"\nCURRENT LEARNING OBJECTIVE: {current_objective}")
+
+    return ("\n".join(parts) if parts else None), stats
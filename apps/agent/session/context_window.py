@@ -0,0 +1,65 @@
+"""Tracks which curriculum chunks are already in the LLM's conversation context."""
+
+import hashlib
+import sys
+
+from rag.context import estimate_tokens
+
+
+def chunk_key(chunk: dict) -> str:
+    """The chunk's id, or a hash of its content for chunks without one."""
+    return chunk.get("id") or hashlib.sha1(chunk.get("content", "").encode()).hexdigest()
+
+
+class ContextWindow:
+    """The curriculum chunks injected so far in a session.
+
+    The session's chat context is never truncated, so a chunk stays visible
+    to the LLM from the turn it is injected until the session ends and is
+    not injected again; a chunk cut short to fit the token budget is not
+    marked live. ``skipped_tokens`` counts the tokens not re-sent.
+    """
+
+    def __init__(self):
+        self._live: set[str] = set()
+        self.injected = 0
+        self.skipped = 0
+        self.skipped_tokens = 0
+
+    def filter_new(self, chunks: list[dict]) -> tuple[list[dict], int]:
+        """Drop chunks already in the context; returns the rest and the tokens dropped."""
+        fresh = []
+        tokens = 0
+        for chunk in chunks:
+            if chunk_key(chunk) in self._live:
+                tokens += estimate_tokens(chunk.get("content", ""))
+            else:
+                fresh.append(chunk)
+        self.skipped += len(chunks) - len(fresh)
+        self.skipped_tokens += tokens
+        return fresh, tokens
+
+    def record_injection(self, chunks: list[dict]):
+        for chunk in chunks:
+            self.injected += 1
+            if chunk.get("truncated"):
+                # Only part of it was sent; the full chunk can still be injected later.
+                continue
+            # Chunks stitched into this one are in the context too.
+            self._live.add(chunk_key(chunk))
+            self._live.update(chunk.get("merged_ids", []))
+
+    def live_chunk_ids(self) -> list[str]:
+        return list(self._live)
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the window's bookkeeping (chunk keys are shared strings)."""
+        return sys.getsizeof(self._live)
+
+    def stats(self) -> dict:
+        return {
+            "injected": self.injected,
+            "skipped": self.skipped,
+            "skipped_tokens": self.skipped_tokens,
+            "live_chunks": len(self._live),
+        }
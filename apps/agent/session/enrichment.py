@@ -0,0 +1,84 @@
+"""Concurrent turn preparation under a latency budget."""
+
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+
+class Enricher:
+    """A named async step that adds context to a user turn.
+
+    If the step misses the deadline or fails, the turn gets its last-known
+    value when ``reuse_last`` is set (and one exists), otherwise ``fallback``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[str], Awaitable[Any]],
+        fallback: Any = None,
+        reuse_last: bool = False,
+    ):
+        self.name = name
+        self.fn = fn
+        self.fallback = fallback
+        self.reuse_last = reuse_last
+
+
+class TurnPreparer:
+    """Runs every enricher for a turn in parallel and stops waiting at the deadline."""
+
+    def __init__(self, enrichers: list[Enricher], deadline: Optional[float] = None):
+        self.enrichers = enrichers
+        self.deadline = (
+            deadline if deadline is not None
+            else float(os.getenv("TURN_ENRICH_DEADLINE_MS", "150")) / 1000
+        )
+        self.last_values: dict[str, Any] = {}
+        self.last_timings: dict[str, float] = {}
+        self.last_missed: list[str] = []
+
+    async def prepare(self, text: str) -> dict[str, Any]:
+        """Return each enricher's result for the text, keyed by enricher name."""
+        stage_times: dict[str, float] = {}
+        start = time.perf_counter()
+
+        async def timed(enricher: Enricher):
+            stage_start = time.perf_counter()
+            try:
+                return await enricher.fn(text)
+            finally:
+                stage_times[enricher.name] = time.perf_counter() - stage_start
+
+        tasks = {asyncio.ensure_future(timed(e)): e for e in self.enrichers}
+        if not tasks:
+            return {}
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        cutoff = time.perf_counter() - start
+        for task in pending:
+            task.cancel()
+
+        # Cancelled stages record their time later; report them at the cutoff.
+        timings = dict(stage_times)
+        results: dict[str, Any] = {}
+        missed: list[str] = []
+        for task, enricher in tasks.items():
+            if task in done and task.exception() is None:
+                value = task.result()
+                self.last_values[enricher.name] = value
+            else:
+                if task in done:
+                    print(f"Enricher {enricher.name} failed: {task.exception()}")
+                missed.append(enricher.name)
+                timings.setdefault(enricher.name, cutoff)
+                if enricher.reuse_last and enricher.name in self.last_values:
+                    value = self.last_values[enricher.name]
+                else:
+                    value = enricher.fallback
+            results[enricher.name] = value
+
+        timings["total"] = time.perf_counter() - start
+        self.last_timings = timings
+        self.last_missed = missed
+        return results
@@ -0,0 +1,199 @@
+"""Bounded, compact conversation history for a tutoring session."""
+
+import math
+import os
+import struct
+import sys
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+
+SENTIMENTS = ("neutral", "confused", "frustrated", "excited", "bored", "disengaged")
+SENTIMENT_CODES = {name: code for code, name in enumerate(SENTIMENTS)}
+
+ROLES = ("student", "tutor")
+ROLE_CODES = {name: code for code, name in enumerate(ROLES)}
+
+# role, sentiment, timestamp, content length; the UTF-8 content follows
+TURN_HEADER = struct.Struct("<BBdI")
+# summarized turns, summary start and end (NaN if none), snippet count; a count per sentiment follows
+SUMMARY_HEADER = struct.Struct("<IddI")
+COUNT = struct.Struct("<I")
+
+
+class Turn:
+    """One conversation turn with integer-coded role and sentiment and an epoch timestamp."""
+
+    __slots__ = ("role", "sentiment", "timestamp", "content")
+
+    def __init__(self, role: int, sentiment: int, timestamp: float, content: str):
+        self.role = role
+        self.sentiment = sentiment
+        self.timestamp = timestamp
+        self.content = content
+
+    def size(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.content)
+
+    def to_bytes(self) -> bytes:
+        content = self.content.encode()
+        return TURN_HEADER.pack(self.role, self.sentiment, self.timestamp, len(content)) + content
+
+    @classmethod
+    def from_buffer(cls, data: bytes, offset: int = 0) -> tuple["Turn", int]:
+        """The turn encoded at ``offset`` and the offset just past it."""
+        role, sentiment, timestamp, length = TURN_HEADER.unpack_from(data, offset)
+        offset += TURN_HEADER.size
+        return cls(role, sentiment, timestamp, data[offset:offset + length].decode()), offset + length
+
+    def to_dict(self) -> dict:
+        return {
+            "role": ROLES[self.role],
+            "content": self.content,
+            "sentiment": SENTIMENTS[self.sentiment],
+            "timestamp": datetime.fromtimestamp(self.timestamp, timezone.utc).isoformat(),
+        }
+
+
+class ConversationHistory:
+    """Keeps the most recent turns verbatim and folds older ones into a rolling summary.
+
+    At most ``max_turns`` turns are held, and fewer if their text exceeds
+    ``max_bytes``. Evicted turns leave behind sentiment counts, a time span
+    and a short snippet of each, with the oldest snippets dropped once the
+    summary passes ``max_summary_chars``.
+    """
+
+    SNIPPET_WORDS = 12
+
+    def __init__(
+        self,
+        max_turns: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_summary_chars: int = 2000,
+    ):
+        self.max_turns = max_turns or int(os.getenv("HISTORY_MAX_TURNS", "40"))
+        self.max_bytes = max_bytes or int(os.getenv("HISTORY_MAX_BYTES", "65536"))
+        self.max_summary_chars = max_summary_chars
+        self._turns: deque[Turn] = deque()
+        self._bytes = 0
+        self.summarized_turns = 0
+        self.summary_sentiments = [0] * len(SENTIMENTS)
+        self.summary_start: Optional[float] = None
+        self.summary_end: Optional[float] = None
+        self._snippets: deque[str] = deque()
+        self._snippet_chars = 0
+
+    def append(
+        self, role: str, content: str, sentiment: Optional[str] = None, timestamp: Optional[float] = None,
+    ) -> Turn:
+        """Record a turn, evicting the oldest ones into the summary as needed."""
+        turn = Turn(
+            ROLE_CODES.get(role, 0),
+            SENTIMENT_CODES.get(sentiment or "neutral", 0),
+            timestamp if timestamp is not None else time.time(),
+            content,
+        )
+        self.append_turn(turn)
+        return turn
+
+    def append_turn(self, turn: Turn):
+        self._turns.append(turn)
+        self._bytes += turn.size()
+        while len(self._turns) > self.max_turns or (
+            self._bytes > self.max_bytes and len(self._turns) > 1
+        ):
+            self._evict()
+
+    def _evict(self):
+        turn = self._turns.popleft()
+        self._bytes -= turn.size()
+        self.summarized_turns += 1
+        self.summary_sentiments[turn.sentiment] += 1
+        if self.summary_start is None:
+            self.summary_start = turn.timestamp
+        self.summary_end = turn.timestamp
+
+        words = turn.content.split()
+        snippet = " ".join(words[: self.SNIPPET_WORDS]) + ("..." if len(words) > self.SNIPPET_WORDS else "")
+        snippet = f"{ROLES[turn.role]}: {snippet}"
+        self._snippets.append(snippet)
+        self._snippet_chars += len(snippet)
+        while self._snippet_chars > self.max_summary_chars and len(self._snippets) > 1:
+            self._snippet_chars -= len(self._snippets.popleft())
+
+    def __len__(self) -> int:
+        return len(self._turns)
+
+    def __iter__(self) -> Iterator[Turn]:
+        return iter(self._turns)
+
+    def recent(self, n: int) -> list[Turn]:
+        return list(self._turns)[-n:]
+
+    def to_dicts(self) -> list[dict]:
+        """The retained turns in the original list-of-dicts shape."""
+        return [turn.to_dict() for turn in self._turns]
+
+    def summary(self) -> str:
+        """Plain-text summary of the turns no longer held verbatim."""
+        if not self.summarized_turns:
+            return ""
+        moods = ", ".join(
+            f"{SENTIMENTS[code]} x{count}"
+            for code, count in enumerate(self.summary_sentiments) if count
+        )
+        minutes = (self.summary_end - self.summary_start) / 60
+        lines = [f"Earlier in this session ({self.summarized_turns} turns over {minutes:.0f} min; {moods}):"]
+        lines.extend(f"- {snippet}" for snippet in self._snippets)
+        return "\n".join(lines)
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by retained turns and the summary."""
+        return self._bytes + self._snippet_chars + sys.getsizeof(self._turns)
+
+    def to_bytes(self) -> bytes:
+        """Summary counters, snippets and retained turns, packed with ``struct``."""
+        parts = [
+            SUMMARY_HEADER.pack(
+                self.summarized_turns,
+                math.nan if self.summary_start is None else self.summary_start,
+                math.nan if self.summary_end is None else self.summary_end,
+                len(self._snippets),
+            ),
+            struct.pack(f"<B{len(SENTIMENTS)}I", len(SENTIMENTS), *self.summary_sentiments),
+        ]
+        for snippet in self._snippets:
+            encoded = snippet.encode()
+            parts += [COUNT.pack(len(encoded)), encoded]
+        parts.append(COUNT.pack(len(self._turns)))
+        parts += [turn.to_bytes() for turn in self._turns]
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, **params) -> "ConversationHistory":
+        history = cls(**params)
+        summarized, start, end, snippets = SUMMARY_HEADER.unpack_from(data)
+        offset = SUMMARY_HEADER.size
+        (count,) = struct.unpack_from("<B", data, offset)
+        sentiments = struct.unpack_from(f"<{count}I", data, offset + 1)
+        offset += 1 + 4 * count
+        history.summarized_turns = summarized
+        history.summary_start = None if math.isnan(start) else start
+        history.summary_end = None if math.isnan(end) else end
+        history.summary_sentiments = [*sentiments, *[0] * (len(SENTIMENTS) - count)][:len(SENTIMENTS)]
+        for _ in range(snippets):
+            (length,) = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            snippet = data[offset:offset + length].decode()
+            offset += length
+            history._snippets.append(snippet)
+            history._snippet_chars += len(snippet)
+        (turns,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        for _ in range(turns):
+            turn, offset = Turn.from_buffer(data, offset)
+            history.append_turn(turn)
+        return history
@@ -0,0 +1,221 @@
+"""Session snapshots on local disk, so a re-dispatched job can resume a dropped session."""
+
+import os
+import struct
+import time
+import zlib
+from typing import Callable, Optional
+
+from pedagogy.learner import LearnerModel, path_component
+from .history import ConversationHistory, Turn
+
+MAGIC = b"EDSS"
+VERSION = 1
+# record type, payload length, CRC-32 of the payload
+FRAME = struct.Struct("<BII")
+BASE, TURN, STATE = 1, 2, 3
+# magic, version, session start, context tokens saved
+BASE_HEADER = struct.Struct("<4sHdI")
+COUNT = struct.Struct("<I")
+
+
+def pack_bytes(data: bytes) -> bytes:
+    return COUNT.pack(len(data)) + data
+
+
+def unpack_bytes(data: bytes, offset: int) -> tuple[bytes, int]:
+    (length,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    if offset + length > len(data):
+        raise ValueError("truncated field")
+    return data[offset:offset + length], offset + length
+
+
+class SessionSnapshot:
+    """What a session needs to carry on where it stopped."""
+
+    def __init__(
+        self,
+        session_id: str,
+        system_prompt: str,
+        history: ConversationHistory,
+        learner: Optional[LearnerModel] = None,
+        session_start: Optional[float] = None,
+        context_tokens_saved: int = 0,
+    ):
+        self.session_id = session_id
+        self.system_prompt = system_prompt
+        self.history = history
+        self.learner = learner
+        self.session_start = session_start if session_start is not None else time.time()
+        self.context_tokens_saved = context_tokens_saved
+
+    def base_payload(self) -> bytes:
+        return b"".join([
+            BASE_HEADER.pack(MAGIC, VERSION, self.session_start, self.context_tokens_saved),
+            pack_bytes(self.session_id.encode()),
+            pack_bytes(self.system_prompt.encode()),
+            pack_bytes(self.history.to_bytes()),
+            pack_bytes(self.learner.to_bytes() if self.learner is not None else b""),
+        ])
+
+    @classmethod
+    def from_base(cls, payload: bytes) -> "SessionSnapshot":
+        magic, version, session_start, tokens_saved = BASE_HEADER.unpack_from(payload)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a session snapshot (magic {magic!r}, version {version})")
+        offset = BASE_HEADER.size
+        session_id, offset = unpack_bytes(payload, offset)
+        system_prompt, offset = unpack_bytes(payload, offset)
+        history, offset = unpack_bytes(payload, offset)
+        learner, offset = unpack_bytes(payload, offset)
+        return cls(
+            session_id.decode(),
+            system_prompt.decode(),
+            ConversationHistory.from_bytes(history),
+            LearnerModel.from_bytes(learner) if learner else None,
+            session_start,
+            tokens_saved,
+        )
+
+    def apply_state(self, payload: bytes):
+        (self.context_tokens_saved,) = COUNT.unpack_from(payload)
+        learner, _ = unpack_bytes(payload, COUNT.size)
+        self.learner = LearnerModel.from_bytes(learner) if learner else None
+
+
+class SnapshotWriter:
+    """Appends one small record per change to a session's snapshot file.
+
+    The file starts with a full BASE record; each turn then appends a TURN
+    record and each assessment a STATE record. After ``compact_every``
+    appended records the file is rewritten as a single BASE taken from
+    ``snapshot_fn``, so loading never replays more than that.
+    """
+
+    def __init__(self, path: str, snapshot_fn: Callable[[], SessionSnapshot], compact_every: int = 64):
+        self.path = path
+        self.snapshot_fn = snapshot_fn
+        self.compact_every = compact_every
+        self.appended = 0
+        self.failed = False
+        self.discarded = False
+
+    def write_base(self):
+        if self.discarded:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "wb") as f:
+                f.write(self._frame(BASE, self.snapshot_fn().base_payload()))
+            os.replace(self.path + ".tmp", self.path)
+            self.appended = 0
+            self.failed = False
+        except OSError as e:
+            print(f"Session snapshot write error: {e}")
+            self.failed = True
+
+    def append_turn(self, turn: Turn):
+        self._append(TURN, turn.to_bytes())
+
+    def append_state(self, context_tokens_saved: int, learner: Optional[LearnerModel]):
+        learner_bytes = learner.to_bytes() if learner is not None else b""
+        self._append(STATE, COUNT.pack(context_tokens_saved) + pack_bytes(learner_bytes))
+
+    def discard(self):
+        """Delete the snapshot and stop writing; the session ended and must not be resumed."""
+        self.discarded = True
+        for path in (self.path, self.path + ".tmp"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Session snapshot delete error: {e}")
+
+    def _append(self, kind: int, payload: bytes):
+        if self.discarded:
+            return
+        if self.failed or self.appended >= self.compact_every:
+            # The change is already in the session's state, so a new base includes it.
+            self.write_base()
+            return
+        try:
+            with open(self.path, "ab") as f:
+                f.write(self._frame(kind, payload))
+            self.appended += 1
+        except OSError as e:
+            print(f"Session snapshot write error: {e}")
+            self.failed = True
+
+    @staticmethod
+    def _frame(kind: int, payload: bytes) -> bytes:
+        return FRAME.pack(kind, len(payload), zlib.crc32(payload)) + payload
+
+
+class SnapshotStore:
+    """Snapshot files under ``SESSION_SNAPSHOT_DIR``, one per student and course.
+
+    A student who reconnects gets a new room and session id from the web
+    app, so the snapshot is keyed by what the reconnect carries: the student
+    and course in the session config. The agent discards it when the student
+    ends the lesson; after a dropped connection or a crash it is kept for
+    the next session on the course. Snapshots older than ``max_age`` seconds
+    are ignored.
+    """
+
+    def __init__(self, snapshot_dir: Optional[str] = None, max_age: Optional[float] = None):
+        self.snapshot_dir = snapshot_dir or os.getenv("SESSION_SNAPSHOT_DIR", "./data/sessions")
+        self.max_age = max_age or float(os.getenv("SESSION_SNAPSHOT_MAX_AGE_SECONDS", "3600"))
+
+    @staticmethod
+    def key(student_id: Optional[str], course_id: Optional[str]) -> Optional[str]:
+        if not student_id or not course_id:
+            return None
+        return f"{path_component(student_id)}.{path_component(course_id)}"
+
+    def path(self, key: Optional[str]) -> Optional[str]:
+        if not key:
+            return None
+        return os.path.join(self.snapshot_dir, f"{path_component(key)}.snap")
+
+    def load(self, key: Optional[str]) -> Optional[SessionSnapshot]:
+        """The latest session state under ``key``, replaying records up to the first torn or corrupt one."""
+        path = self.path(key)
+        if path is None:
+            return None
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Session snapshot load error: {e}")
+            return None
+
+        snapshot = None
+        offset = 0
+        try:
+            while offset + FRAME.size <= len(data):
+                kind, length, crc = FRAME.unpack_from(data, offset)
+                payload = data[offset + FRAME.size:offset + FRAME.size + length]
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                offset += FRAME.size + length
+                if kind == BASE:
+                    snapshot = SessionSnapshot.from_base(payload)
+                elif snapshot is None:
+                    break
+                elif kind == TURN:
+                    snapshot.history.append_turn(Turn.from_buffer(payload)[0])
+                elif kind == STATE:
+                    snapshot.apply_state(payload)
+        except (ValueError, struct.error, UnicodeDecodeError) as e:
+            print(f"Session snapshot load error: {e}")
+        return snapshot
+
+    def writer(self, key: Optional[str], snapshot_fn: Callable[[], SessionSnapshot]) -> Optional[SnapshotWriter]:
+        path = self.path(key)
+        return SnapshotWriter(path, snapshot_fn) if path is not None else None
@@ -0,0 +1,175 @@
+"""Cache for function tool results, stored as the JSON strings the tools return."""
+
+import functools
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+METRIC_PREFIX = "eduavatar_tool_cache"
+
+
+def normalize_arg(value) -> Hashable:
+    """Case- and whitespace-insensitive strings, rounded floats; other values as they are."""
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, float):
+        return round(value, 6)
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_arg(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalize_arg(v)) for k, v in value.items()))
+    return value
+
+
+class ToolStats:
+    __slots__ = ("hits", "misses", "saved_ms")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+
+
+class ToolResultCache:
+    """LRU of tool payloads keyed by (tool, scope, course, normalized arguments, version).
+
+    Tools opt in with ``memoize``, which only suits tools whose result
+    depends on their arguments and course alone and that change no state: a
+    hit skips the body entirely. A ``session`` scoped tool only reuses
+    results within one session; a ``process`` scoped one shares them across
+    every session on the course. A tool whose result depends on data other
+    processes rewrite (such as the course index) passes ``version``, called
+    with the course id on every call: once it changes, the old entries are
+    never hit again and age out. Entries expire after ``ttl`` seconds (per
+    tool if given) and the oldest are evicted past ``max_entries``. A hit
+    returns the stored string, so the tool body and its ``json.dumps`` are
+    skipped; ``saved_ms`` adds up what the original call took.
+    ``TOOL_CACHE=off`` disables caching.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl: Optional[float] = None):
+        self.enabled = os.getenv("TOOL_CACHE", "on") != "off"
+        self.max_entries = max_entries or int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+        self.ttl = ttl or float(os.getenv("TOOL_CACHE_TTL_SECONDS", "300"))
+        # key -> (expires_at, payload, ms the call took); key[:3] is (tool, session_id, course_id)
+        self._entries: OrderedDict[tuple, tuple[float, str, float]] = OrderedDict()
+        self._stats: dict[str, ToolStats] = {}
+        self._lock = threading.Lock()
+
+    def memoize(
+        self,
+        tool: str,
+        scope: str = "session",
+        ttl: Optional[float] = None,
+        version: Optional[Callable[[Optional[str]], Hashable]] = None,
+    ):
+        """Cache an async tool taking (context: RunContext, ...) and returning a str."""
+        if scope not in ("session", "process"):
+            raise ValueError(f"scope must be 'session' or 'process', got {scope!r}")
+
+        def decorator(fn):
+            signature = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            async def wrapper(context, *args, **kwargs):
+                if not self.enabled:
+                    return await fn(context, *args, **kwargs)
+                bound = signature.bind(context, *args, **kwargs)
+                bound.apply_defaults()
+                arguments = tuple((name, normalize_arg(value)) for name, value in list(bound.arguments.items())[1:])
+                agent = context.agent
+                course_id = agent.course.get("id")
+                key = (
+                    tool,
+                    agent.session_id if scope == "session" else None,
+                    course_id,
+                    arguments,
+                    version(course_id) if version is not None else None,
+                )
+                payload = self.get(key)
+                if payload is not None:
+                    return payload
+                start = time.perf_counter_ns()
+                payload = await fn(context, *args, **kwargs)
+                if isinstance(payload, str):
+                    self.put(key, payload, (time.perf_counter_ns() - start) / 1e6, ttl)
+                return payload
+            return wrapper
+        return decorator
+
+    def _tool_stats(self, tool: str) -> ToolStats:
+        stats = self._stats.get(tool)
+        if stats is None:
+            stats = self._stats[tool] = ToolStats()
+        return stats
+
+    def get(self, key: tuple) -> Optional[str]:
+        with self._lock:
+            stats = self._tool_stats(key[0])
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            stats.hits += 1
+            stats.saved_ms += entry[2]
+            return entry[1]
+
+    def put(self, key: tuple, payload: str, ms: float, ttl: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + (ttl or self.ttl), payload, ms)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(
+        self,
+        tool: Optional[str] = None,
+        session_id: Optional[str] = None,
+        course_id: Optional[str] = None,
+    ) -> int:
+        """Drop the entries matching every given filter; returns how many were dropped."""
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if (tool is None or key[0] == tool)
+                and (session_id is None or key[1] == session_id)
+                and (course_id is None or key[2] == course_id)
+            ]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                tool: {
+                    "hits": s.hits,
+                    "misses": s.misses,
+                    "hit_rate": round(s.hits / (s.hits + s.misses), 3) if s.hits + s.misses else 0.0,
+                    "saved_ms": round(s.saved_ms, 1),
+                }
+                for tool, s in sorted(self._stats.items())
+            }
+
+    def prometheus_text(self) -> str:
+        lines = [
+            f"# HELP {METRIC_PREFIX}_requests_total Tool calls answered from the cache (hit) or run (miss).",
+            f"# TYPE {METRIC_PREFIX}_requests_total counter",
+        ]
+        stats = self.stats()
+        for tool, s in stats.items():
+            lines.append(f'{METRIC_PREFIX}_requests_total{{tool="{tool}",result="hit"}} {s["hits"]}')
+            lines.append(f'{METRIC_PREFIX}_requests_total{{tool="{tool}",result="miss"}} {s["misses"]}')
+        lines += [
+            f"# HELP {METRIC_PREFIX}_saved_ms_total Tool time avoided by cache hits in milliseconds.",
+            f"# TYPE {METRIC_PREFIX}_saved_ms_total counter",
+        ]
+        for tool, s in stats.items():
+            lines.append(f'{METRIC_PREFIX}_saved_ms_total{{tool="{tool}"}} {s["saved_ms"]}')
+        return "\n".join(lines) + "\n"
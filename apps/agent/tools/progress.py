@@ -1,15 +1,87 @@
 """Progress tracking tool."""
 
-import httpx
+import asyncio
+import fcntl
+import glob
+import json
 import os
+import time
+import uuid
+from typing import Optional
+
+import httpx
+
+from utils.pools import shared
+
+
+def try_lock(path: str) -> Optional[int]:
+    """Open and exclusively flock ``path`` without blocking; None if another process holds it."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
 
 
 class ProgressTracker:
-    """Tracks and updates student learning progress."""
+    """Tracks and updates student learning progress.
 
-    def __init__(self):
+    Updates are written behind: ``update`` only records the latest status per
+    (student, objective) and returns. A background task posts the pending
+    updates in one request every ``flush_interval`` seconds, or sooner once
+    ``max_batch`` are waiting. The batch is POSTed to /api/sessions/progress
+    as ``{"updates": [...]}``, each carrying the number of ``attempts`` it
+    stands for, with ``AGENT_API_SECRET`` as a bearer token. If the API is
+    unreachable they are appended to a local journal and replayed on the
+    next successful flush.
+
+    Each tracker journals to ``<journal_path>.<worker_id>`` (a random id, as
+    pids repeat across containers) and holds an flock on
+    ``<journal_path>.<worker_id>.lock`` while it runs, so workers sharing a
+    data directory never replay or delete each other's entries. A journal
+    whose lock can be taken belongs to a worker that has exited; it is taken
+    over by renaming it first.
+
+    In multi-session mode the queue, client and flusher live on the shared
+    loop (see ``utils.pools``), so every session feeds one batch.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 2.0,
+        max_batch: int = 50,
+        journal_path: Optional[str] = None,
+    ):
         self.api_url = os.getenv("API_URL", "http://localhost:3000")
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.journal_path = journal_path or os.getenv("PROGRESS_JOURNAL_PATH", "./data/progress.journal")
+        self.api_secret = os.getenv("AGENT_API_SECRET", "")
+        self.worker_id = uuid.uuid4().hex
+        self._lock_fd: Optional[int] = None
+        self._pending: dict[tuple[str, str], dict] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.posted = 0
+        self.merged = 0
+        self.journaled = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            headers = {"Authorization": f"Bearer {self.api_secret}"} if self.api_secret else None
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers=headers,
+                timeout=httpx.Timeout(10.0, connect=3.0),
+            )
+        return self._client
 
+    @shared
     async def update(
         self,
         student_id: str,
@@ -17,19 +89,177 @@ class ProgressTracker:
         status: str,
         score: float = None,
     ) -> bool:
-        """Update learning progress via the API."""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_url}/api/sessions/progress",
-                    json={
-                        "studentId": student_id,
-                        "objectiveId": objective_id,
-                        "status": status,
-                        "score": score,
-                    },
+        """Queue a progress update; it is sent by the background flusher."""
+        key = (student_id, objective_id)
+        attempts = 1
+        if key in self._pending:
+            self.merged += 1
+            attempts += self._pending[key]["attempts"]
+        self._pending[key] = {
+            "studentId": student_id,
+            "objectiveId": objective_id,
+            "status": status,
+            "score": score,
+            "attempts": attempts,
+            "updatedAt": time.time(),
+        }
+        self._ensure_flusher()
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return True
+
+    def _ensure_flusher(self):
+        if self._flusher is None or self._flusher.done():
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._flusher = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    @shared
+    async def flush(self) -> bool:
+        """Send pending and journaled updates now. Returns False if they were journaled instead."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            journals = self._claim_journals()
+            journaled = self._read_journals(journals)
+            if not pending and not journaled:
+                return True
+
+            # Journal entries are older than anything pending in memory.
+            merged = {**journaled, **pending}
+            for key, update in journaled.items():
+                if key in pending:
+                    merged[key] = {**pending[key], "attempts": pending[key]["attempts"] + update["attempts"]}
+            try:
+                response = await self.client.post(
+                    "/api/sessions/progress",
+                    json={"updates": list(merged.values())},
                 )
-                return response.status_code == 200
-        except Exception as e:
-            print(f"Progress update error: {e}")
-            return False
+                response.raise_for_status()
+            except Exception as e:
+                print(f"Progress update error: {e}")
+                self._append_journal(pending.values())
+                return False
+
+            self.posted += 1
+            for path in journals:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            return True
+
+    def _journal_file(self) -> str:
+        return f"{self.journal_path}.{self.worker_id}"
+
+    def _hold_lock(self):
+        """Mark this worker's journals as in use; the kernel releases the lock when the process exits."""
+        if self._lock_fd is None:
+            self._lock_fd = try_lock(f"{self._journal_file()}.lock")
+
+    def _append_journal(self, updates):
+        updates = list(updates)
+        if not updates:
+            return
+        directory = os.path.dirname(self.journal_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._hold_lock()
+        with open(self._journal_file(), "a") as f:
+            for update in updates:
+                f.write(json.dumps(update) + "\n")
+        self.journaled += len(updates)
+
+    def _claim_journals(self) -> list[str]:
+        """This worker's journal files, after renaming to it any whose writer has exited."""
+        own = self._journal_file()
+        claimed = []
+        others: dict[str, list[str]] = {}
+        for path in glob.glob(glob.escape(self.journal_path) + ".*"):
+            writer = path[len(self.journal_path) + 1:].split(".")[0]
+            if writer == self.worker_id:
+                if not path.endswith(".lock"):
+                    claimed.append(path)
+            else:
+                others.setdefault(writer, []).append(path)
+
+        for writer, paths in others.items():
+            lock_path = f"{self.journal_path}.{writer}.lock"
+            fd = try_lock(lock_path)
+            if fd is None:
+                continue  # its worker is still running
+            self._hold_lock()
+            try:
+                for path in paths:
+                    if path.endswith(".lock"):
+                        continue
+                    # The rename is atomic, so only one worker takes over an orphaned journal.
+                    target = f"{own}.{time.time_ns()}"
+                    try:
+                        os.rename(path, target)
+                    except FileNotFoundError:
+                        continue
+                    claimed.append(target)
+                try:
+                    os.remove(lock_path)
+                except FileNotFoundError:
+                    pass
+            finally:
+                os.close(fd)
+        return claimed
+
+    @staticmethod
+    def _read_journals(paths: list[str]) -> dict[tuple[str, str], dict]:
+        updates: dict[tuple[str, str], dict] = {}
+        for path in paths:
+            try:
+                with open(path) as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                continue
+            for line in lines:
+                try:
+                    update = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                key = (update["studentId"], update["objectiveId"])
+                update.setdefault("attempts", 1)
+                previous = updates.get(key)
+                if previous is None:
+                    updates[key] = update
+                    continue
+                # Every journaled entry is a distinct, unsent set of attempts.
+                attempts = previous["attempts"] + update["attempts"]
+                if update.get("updatedAt", 0) >= previous.get("updatedAt", 0):
+                    updates[key] = update
+                updates[key]["attempts"] = attempts
+        return updates
+
+    @shared
+    async def aclose(self):
+        """Stop the flusher after a final flush and close the client."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        await self.flush()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "posted_batches": self.posted,
+            "merged": self.merged,
+            "journaled": self.journaled,
+        }
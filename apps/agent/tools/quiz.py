@@ -22,3 +22,21 @@ class QuizGenerator:
             "expected_depth": bloom_level.value,
             "topic": topic,
         }
+
+    def generate_questions(
+        self,
+        topic: str,
+        bloom_level: BloomLevel = BloomLevel.UNDERSTAND,
+        count: int = 4,
+    ) -> list[dict]:
+        """Generate up to count questions for a topic, each from a different stem."""
+        stems = BLOOM_QUESTION_STEMS.get(bloom_level, BLOOM_QUESTION_STEMS[BloomLevel.UNDERSTAND])
+        return [
+            {
+                "question": f"{stem} {topic}?",
+                "bloom_level": bloom_level.name,
+                "expected_depth": bloom_level.value,
+                "topic": topic,
+            }
+            for stem in random.sample(stems, min(count, len(stems)))
+        ]
@@ -0,0 +1,90 @@
+"""Single-pass multi-keyword matching over student utterances."""
+
+import re
+from typing import Optional
+
+
+def _trie_pattern(node: dict) -> str:
+    """Render a character trie as a regex; the "" key marks the end of a keyword."""
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # Greedy, so the longest keyword is tried first and shorter ones on backtrack.
+        pattern = "(?:" + pattern + ")?"
+    return pattern
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """Finds every keyword of every category in one scan of the text.
+
+    The keywords are compiled into a single trie-shaped regex, so the cost of
+    a scan grows with the length of the text and the longest keyword, not
+    with the number of keywords. With ``word_boundary`` keywords only match
+    whole words ("sure" does not match inside "measure"). Matching is case
+    insensitive.
+    """
+
+    def __init__(self, categories: dict[str, list[str]], word_boundary: bool = True):
+        self.word_boundary = word_boundary
+        self.categories = list(categories)
+        self._keyword_categories: dict[str, list[str]] = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    self._keyword_categories.setdefault(keyword, []).append(category)
+
+        trie: dict = {}
+        for keyword in self._keyword_categories:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+
+        body = _trie_pattern(trie) if trie else "(?!)"
+        if word_boundary:
+            # Lookarounds rather than \b, which fails next to keywords that
+            # start or end in punctuation ("c++", ".net").
+            self._pattern = re.compile(r"(?<!\w)(?=(" + body + r")(?!\w))")
+        else:
+            self._pattern = re.compile("(?=(" + body + "))")
+
+        # The regex reports the longest keyword at each start position; shorter
+        # keywords that are prefixes of it matched there too.
+        self._prefixes: dict[str, list[str]] = {}
+        for keyword in self._keyword_categories:
+            self._prefixes[keyword] = [
+                keyword[:i] for i in range(1, len(keyword))
+                if keyword[:i] in self._keyword_categories
+                and (not word_boundary or not _is_word_char(keyword[i]))
+            ]
+
+    def scan(self, text: str) -> dict[str, list[tuple[int, str]]]:
+        """Map each category to its (position, keyword) hits in the text."""
+        hits: dict[str, list[tuple[int, str]]] = {c: [] for c in self.categories}
+        for match in self._pattern.finditer(text.lower()):
+            start = match.start()
+            longest = match.group(1)
+            for keyword in (longest, *self._prefixes[longest]):
+                for category in self._keyword_categories[keyword]:
+                    hits[category].append((start, keyword))
+        return hits
+
+    def counts(self, text: str) -> dict[str, int]:
+        """Number of keyword hits per category."""
+        return {category: len(found) for category, found in self.scan(text).items()}
+
+    def best(self, text: str, priority: Optional[list[str]] = None) -> Optional[str]:
+        """Category with the most hits, ties going to the earlier one in ``priority``."""
+        order = list(priority or []) + self.categories
+        counts = self.counts(text)
+        top = max(counts.values(), default=0)
+        if top == 0:
+            return None
+        return next(c for c in order if counts.get(c) == top)
@@ -0,0 +1,71 @@
+"""Resources shared by every session in a worker process.
+
+Concurrency model for ``AGENT_MULTI_SESSION=on``, where one process hosts
+many rooms, each job on its own thread with its own event loop:
+
+- Shared and read-mostly: index shards, the keyword matcher, the VAD model,
+  question banks and the tracer. These are safe to use from any job thread;
+  their few mutable maps are guarded by a ``threading.Lock`` or only ever
+  swapped whole.
+- Shared and loop-bound: pooled HTTP clients, semaphores and background
+  flushers. Their coroutines run on one ``SharedLoop`` thread, so one
+  connection pool serves every session instead of one per job.
+- Per session: everything reachable from ``EduAvatarAgent`` (history,
+  context window, prosody buffers, learner model, prefetcher) and the
+  LiveKit STT/LLM/TTS plugin clients, which belong to the job's own loop.
+
+With the mode off, ``shared`` methods run on the caller's loop as before.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from typing import Awaitable, Optional
+
+
+class SharedLoop:
+    """An event loop on a daemon thread that owns the process's shared async resources."""
+
+    def __init__(self, enabled: Optional[bool] = None):
+        self.enabled = enabled if enabled is not None else os.getenv("AGENT_MULTI_SESSION", "off") == "on"
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="shared-resources", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def run(self, coro) -> Awaitable:
+        """Awaitable result of ``coro`` run on the shared loop; cancelling it cancels the coroutine."""
+        if not self.enabled or self._on_loop():
+            return coro
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    def spawn(self, coro):
+        """Start ``coro`` in the background without waiting for it."""
+        if not self.enabled or self._on_loop():
+            return asyncio.ensure_future(coro)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+
+shared_loop = SharedLoop()
+
+
+def shared(method):
+    """Run an async method on the shared loop when multi-session mode is on."""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        return shared_loop.run(method(*args, **kwargs))
+    return wrapper
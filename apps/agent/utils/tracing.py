@@ -0,0 +1,258 @@
+"""Per-stage latency tracing: monotonic spans, fixed-bucket histograms, Prometheus text and JSONL export."""
+
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+# Upper bounds in milliseconds; anything slower lands in the +Inf bucket.
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2500, 5000, 10000)
+METRIC_NAME = "eduavatar_stage_latency_ms"
+
+
+class Histogram:
+    """Counts of observations per latency bucket, plus their sum."""
+
+    __slots__ = ("bounds", "counts", "total", "count")
+
+    def __init__(self, bounds: tuple = DEFAULT_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(self.bounds, ms)] += 1
+        self.total += ms
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-th quantile by interpolating inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.bounds[i - 1] if i else 0.0
+                if i == len(self.bounds):
+                    return float(lower)
+                return lower + (self.bounds[i] - lower) * (rank - seen) / n
+            seen += n
+        return float(self.bounds[-1])
+
+
+class Span:
+    """Times a block with the monotonic clock and records it on exit."""
+
+    __slots__ = ("tracer", "stage", "attrs", "start")
+
+    def __init__(self, tracer: "Tracer", stage: str, attrs: dict):
+        self.tracer = tracer
+        self.stage = stage
+        self.attrs = attrs
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter_ns() - self.start) / 1e6
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer.record(self.stage, ms, **self.attrs)
+        return False
+
+
+class Tracer:
+    """Collects stage latencies for one worker process.
+
+    Every span feeds a per-stage histogram. Spans are also buffered and
+    handed every ``flush_every`` records to a writer thread, which appends
+    them to ``jsonl_path`` as JSON lines, so no file I/O happens on the event
+    loop (set ``TRACE_JSONL_PATH=off`` to disable). ``serve`` exposes the
+    histograms in Prometheus text format on ``/metrics``, bound to
+    ``TRACE_METRICS_HOST`` (loopback by default).
+    """
+
+    def __init__(
+        self,
+        jsonl_path: Optional[str] = None,
+        buckets: tuple = DEFAULT_BUCKETS_MS,
+        flush_every: int = 256,
+    ):
+        path = jsonl_path or os.getenv("TRACE_JSONL_PATH", "./data/traces.jsonl")
+        self.jsonl_path = None if path == "off" else path
+        self.buckets = buckets
+        self.flush_every = flush_every
+        self.histograms: dict[str, Histogram] = {}
+        # (wall time, stage, ms, attrs); serialized only when written out.
+        self._buffer: list[tuple] = []
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue[list[tuple]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.port: Optional[int] = None
+        # Other metric sources appended to /metrics, each returning Prometheus text.
+        self.exporters: list[Callable[[], str]] = []
+
+    def span(self, stage: str, **attrs) -> Span:
+        return Span(self, stage, attrs)
+
+    def record(self, stage: str, ms: float, **attrs):
+        """Record a latency measured elsewhere (e.g. reported by a LiveKit metrics event)."""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.buckets)
+            histogram.observe(ms)
+            if self.jsonl_path is not None:
+                self._buffer.append((time.time(), stage, ms, attrs))
+                if len(self._buffer) < self.flush_every:
+                    return
+                records, self._buffer = self._buffer, []
+            else:
+                return
+        self._submit(records)
+
+    def flush(self, wait: bool = False):
+        """Hand buffered records to the writer thread; with ``wait``, block until they are written."""
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        self._submit(records)
+        if wait:
+            self._pending.join()
+
+    def _submit(self, records: list[tuple]):
+        if not records:
+            return
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._drain, name="trace-writer", daemon=True)
+                self._writer.start()
+        self._pending.put(records)
+
+    def _drain(self):
+        while True:
+            records = self._pending.get()
+            try:
+                self._write(records)
+            finally:
+                self._pending.task_done()
+
+    def _write(self, records: list[tuple]):
+        if not records:
+            return
+        pid = os.getpid()
+        lines = [
+            json.dumps({"ts": ts, "pid": pid, "stage": stage, "ms": round(ms, 3), **attrs})
+            for ts, stage, ms, attrs in records
+        ]
+        try:
+            directory = os.path.dirname(self.jsonl_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # One write per batch keeps lines from concurrent worker processes intact.
+            with open(self.jsonl_path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"Trace sink error: {e}")
+
+    def summary(self) -> dict:
+        """p50/p99/count per stage, for logs."""
+        with self._lock:
+            return {
+                stage: {
+                    "count": h.count,
+                    "p50_ms": round(h.quantile(0.5), 1),
+                    "p99_ms": round(h.quantile(0.99), 1),
+                }
+                for stage, h in sorted(self.histograms.items())
+            }
+
+    def prometheus_text(self) -> str:
+        lines = [
+            f"# HELP {METRIC_NAME} Latency of each voice pipeline stage in milliseconds.",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip((*h.bounds, "+Inf"), h.counts):
+                    cumulative += n
+                    lines.append(f'{METRIC_NAME}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_sum{{stage="{stage}"}} {h.total:.3f}')
+                lines.append(f'{METRIC_NAME}_count{{stage="{stage}"}} {h.count}')
+        text = "\n".join(lines) + "\n"
+        return text + "".join(exporter() for exporter in self.exporters)
+
+    def serve(self, port: Optional[int] = None, attempts: int = 16) -> Optional[int]:
+        """Serve ``/metrics`` from a daemon thread.
+
+        Each job process has its own tracer, so if the port is taken the next
+        ones are tried. ``TRACE_METRICS_PORT=0`` disables the endpoint. It
+        listens on ``TRACE_METRICS_HOST``, 127.0.0.1 unless set otherwise.
+        """
+        if self._server is not None:
+            return self.port
+        port = port if port is not None else int(os.getenv("TRACE_METRICS_PORT", "9464"))
+        if not port:
+            return None
+        host = os.getenv("TRACE_METRICS_HOST", "127.0.0.1")
+
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = tracer.prometheus_text().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path == "/summary":
+                    body = json.dumps(tracer.summary()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        for candidate in range(port, port + attempts):
+            try:
+                self._server = ThreadingHTTPServer((host, candidate), MetricsHandler)
+            except OSError:
+                continue
+            self.port = candidate
+            threading.Thread(target=self._server.serve_forever, daemon=True).start()
+            return candidate
+        print(f"Trace metrics error: no free port in {port}-{port + attempts - 1}")
+        return None
+
+    def close(self):
+        self.flush(wait=True)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def traced(tracer: Tracer, stage: str):
+    """Wrap an async function in a span; the signature and docstring are kept for function_tool."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with tracer.span(stage):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,76 @@
+import { timingSafeEqual } from "crypto";
+import { NextRequest, NextResponse } from "next/server";
+import { prisma, ProgressStatus } from "@eduavatar/db";
+
+interface ProgressUpdate {
+  studentId: string;
+  objectiveId: string;
+  status: string;
+  score?: number | null;
+  attempts?: number;
+  updatedAt?: number;
+}
+
+function isProgressUpdate(update: any): update is ProgressUpdate {
+  return (
+    typeof update?.studentId === "string" &&
+    typeof update?.objectiveId === "string" &&
+    Object.values(ProgressStatus).includes(update?.status) &&
+    (update?.attempts === undefined || (Number.isInteger(update.attempts) && update.attempts > 0))
+  );
+}
+
+// Only the agent writes progress; it sends AGENT_API_SECRET as a bearer token.
+function isAgent(req: NextRequest): boolean {
+  const secret = process.env.AGENT_API_SECRET;
+  const header = req.headers.get("authorization") ?? "";
+  if (!secret) return false;
+  const expected = Buffer.from(`Bearer ${secret}`);
+  const actual = Buffer.from(header);
+  return actual.length === expected.length && timingSafeEqual(actual, expected);
+}
+
+// Called by the agent's progress tracker with a batch ({ updates: [...] })
+// or a single update. Each update carries the number of attempts it stands
+// for, as the tracker merges repeated updates to an objective.
+export async function POST(req: NextRequest) {
+  if (!isAgent(req)) {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+  }
+
+  const body = await req.json();
+  const updates: any[] = Array.isArray(body?.updates) ? body.updates : [body];
+
+  if (!updates.every(isProgressUpdate)) {
+    return NextResponse.json({ error: "Invalid progress update" }, { status: 400 });
+  }
+
+  await prisma.$transaction(
+    updates.map((update) => {
+      const status = update.status as ProgressStatus;
+      const score = update.score ?? null;
+      const attempts = update.attempts ?? 1;
+      // updatedAt is in seconds since the epoch, as the agent records it.
+      const lastAttemptAt = update.updatedAt ? new Date(update.updatedAt * 1000) : new Date();
+      return prisma.learningProgress.upsert({
+        where: {
+          studentId_objectiveId: {
+            studentId: update.studentId,
+            objectiveId: update.objectiveId,
+          },
+        },
+        create: {
+          studentId: update.studentId,
+          objectiveId: update.objectiveId,
+          status,
+          score,
+          attempts,
+          lastAttemptAt,
+        },
+        update: { status, score, attempts: { increment: attempts }, lastAttemptAt },
+      });
+    })
+  );
+
+  return NextResponse.json({ received: updates.length });
+}
@@ -189,6 +189,21 @@ function SessionContent({ config }: { config: SessionConfig }) {
     }
   };
 
+  const handleEndSession = async () => {
+    if (room.state === ConnectionState.Connected) {
+      try {
+        // Lets the tutor drop its snapshot; a plain disconnect is resumable.
+        await room.localParticipant?.publishData(
+          new TextEncoder().encode(JSON.stringify({ type: "end_session" })),
+          { reliable: true }
+        );
+      } catch (err) {
+        console.error("Failed to end session:", err);
+      }
+    }
+    room.disconnect();
+  };
+
   const handleSendMessage = (text: string) => {
     setMessages((prev) => [
       ...prev,
@@ -245,7 +260,7 @@ function SessionContent({ config }: { config: SessionConfig }) {
           isMuted={isMuted}
           onMute={handleMute}
           onUnmute={handleUnmute}
-          onEndSession={() => room.disconnect()}
+          onEndSession={handleEndSession}
         />
       </div>
 